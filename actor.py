@@ -0,0 +1,64 @@
+import queue
+import numpy as np
+from environment import UnoEnvironment
+from numpy_policy import NumpyPolicy
+from collector import run_episodes
+from profiler import profiler
+
+
+def run_actor(env_settings, transition_queue, weight_queue, epsilon_settings, return_settings, seed, chunk_size=256, masked_actions=False,
+              league_settings=None):
+    # forked workers inherit the learner's profiler, but only the learner reports and resets it
+    profiler.enabled = False
+
+    # initialize environment and the local copy of the policy (random actions until weights arrive)
+    env_seed, actor_seed = seed.spawn(2)
+    env = UnoEnvironment(*env_settings, seed=env_seed)
+    policy = None
+
+    # preallocated chunk of transitions which is sent to the learner once full
+    states = np.zeros((chunk_size, env.state_size()), dtype=np.float32)
+    actions = np.zeros(chunk_size, dtype=np.int64)
+    rewards = np.zeros(chunk_size, dtype=np.float32)
+    next_states = np.zeros((chunk_size, env.state_size()), dtype=np.float32)
+    dones = np.zeros(chunk_size, dtype=bool)
+    chunk = (states, actions, rewards, next_states, dones)
+    if masked_actions:
+        # legal action masks of the next states
+        next_masks = np.zeros((chunk_size, env.action_count()), dtype=bool)
+        chunk += (next_masks,)
+    count = 0
+    episodes = []
+
+    def add_to_chunk(*transition):
+        nonlocal count, episodes
+        for array, value in zip(chunk, transition):
+            array[count] = value
+        count += 1
+        if count == chunk_size:
+            # send a copy, the queue pickles the chunk in a background thread
+            transition_queue.put((tuple(array.copy() for array in chunk), episodes))
+            count = 0
+            episodes = []
+
+    def update_policy():
+        nonlocal policy
+        # use the most recent weights broadcast by the learner
+        weights = None
+        try:
+            while True:
+                weights = weight_queue.get_nowait()
+        except queue.Empty:
+            pass
+        if weights is not None:
+            policy = NumpyPolicy(weights)
+
+    def episode_done(*metrics):
+        # collect episode metrics for the learner's logger, new weights are used from the next episode on
+        episodes.append(metrics)
+        update_policy()
+
+    update_policy()
+    run_episodes(env, np.random.default_rng(actor_seed), lambda state, legal_mask: policy.predict(state, legal_mask),
+                 lambda: policy is not None, add_to_chunk, episode_done, epsilon_settings, return_settings, masked_actions,
+                 league_settings)
@@ -1,38 +1,119 @@
 import os
-import random
-import collections
 import numpy as np
 import tensorflow as tf
-from tensorboard import TensorflowLogger
+from logger import MetricsLogger
+from replay_memory import ReplayMemory, PrioritizedReplayMemory
+from scheduler import TrainingScheduler
+from inference import InferenceServer
+from experience import ExperienceWriter, ExperienceDataset
+from checkpoint import save_checkpoint, resolve_checkpoint, is_checkpoint, load_checkpoint_state, load_checkpoint_replay
+from numpy_policy import NumpyPolicy, export_model
+from profiler import profiler
 from keras import models, layers, optimizers
+from keras import backend as K
 
 class UnoAgent:
 
     REPLAY_MEMORY_SIZE = 10000
+    PRIORITIZED_REPLAY = False
     BATCH_SIZE = 512
+    REPLAY_RATIO = 0.25
+    MAX_TRAINING_LAG = 100
+    RATE_LOG_FREQUENCY = 100
+    INFERENCE_BATCH_SIZE = 64
+    INFERENCE_MAX_WAIT = 0.001
+    # act with a NumPy copy of the online model instead of the inference server
+    NUMPY_INFERENCE = False
     DISCOUNT_FACTOR = 0.7
+    # only consider legal actions when acting and in the Q targets, legal masks are stored in the replay memory
+    MASKED_ACTIONS = False
+    # number of rewards the collectors accumulate into each transition before bootstrapping
+    N_STEP_RETURNS = 3
+    # select next actions with the online model and evaluate them with the target model
+    DOUBLE_DQN = True
+    # Polyak averaging factor of the target model after every step, None for hard copies every TARGET_UPDATE_FREQUENCY steps
+    TARGET_UPDATE_TAU = 0.005
+    TARGET_UPDATE_FREQUENCY = 1000
+    # frequency of publishing the online model's weights to NumPy policies and worker processes
     MODEL_UPDATE_FREQUENCY = 20
     MODEL_SAVE_FREQUENCY = 1000
+    # full training checkpoints with both models, optimizer state, counters, epsilon and optionally the replay memory
+    CHECKPOINT_FREQUENCY = 1000
+    CHECKPOINT_REPLAY = True
+    CHECKPOINTS_KEPT = 2
+    # metric sinks ('tensorboard', 'csv', 'jsonl') and the aggregation interval in seconds
+    LOG_SINKS = ['tensorboard']
+    LOG_INTERVAL = 10
+    # stream all collected transitions to an on-disk dataset in experience/<timestamp>
+    RECORD_EXPERIENCE = False
 
-    def __init__(self, state_size, action_count, model_path=None):
+    def __init__(self, state_size, action_count, model_path=None, seed=None):
         print('Initializing agent...')
         self.initialized = False
-        self.logger = TensorflowLogger('logs')
+        self.train_steps = 0
+        # latest exploration rate reported by the collectors
+        self.epsilon = None
+        # entropy of the run's root seed, stored in the checkpoints
+        self.seed_entropy = None
+
+        # seed is a SeedSequence for weight initialization and replay sampling
+        if seed is not None:
+            tf.set_random_seed(int(seed.generate_state(1)[0]))
+        self.logger = MetricsLogger('logs', self.LOG_SINKS, self.LOG_INTERVAL)
 
         if model_path is None:
             print('Creating model...')
-            # initialize the prediction model and a clone of it, the target model
+            # initialize the online model, which is trained and acts, and the target model
             self.model = self.create_model(state_size, action_count)
             self.target_model = self.create_model(state_size, action_count)
-            self.target_model.set_weights(self.model.get_weights())
+        elif is_checkpoint(model_path):
+            print('Loading checkpoint to resume the training process...')
+            # load both models, the online model including its optimizer state
+            checkpoint = resolve_checkpoint(model_path)
+            self.model = models.load_model(f'{checkpoint}/model.h5')
+            self.target_model = models.load_model(f'{checkpoint}/target_model.h5')
         else:
             print('Loading model to continue the training process...')
             # load existing model to continue training
             self.model = models.load_model(model_path)
             self.target_model = models.load_model(model_path)
 
+        # target model updates as assign ops, the weights never leave the tensorflow runtime
+        self.session = K.get_session()
+        if self.TARGET_UPDATE_TAU is not None:
+            self.soft_target_update = self.create_target_update(self.TARGET_UPDATE_TAU)
+        self.hard_target_update = self.create_target_update(1.0)
+        if model_path is None:
+            self.session.run(self.hard_target_update)
+
         # initialize the replay memory
-        self.replay_memory = collections.deque(maxlen=self.REPLAY_MEMORY_SIZE)
+        mask_size = action_count if self.MASKED_ACTIONS else None
+        if self.PRIORITIZED_REPLAY:
+            self.replay_memory = PrioritizedReplayMemory(self.REPLAY_MEMORY_SIZE, state_size, seed=seed, mask_size=mask_size)
+        else:
+            self.replay_memory = ReplayMemory(self.REPLAY_MEMORY_SIZE, state_size, seed=seed, mask_size=mask_size)
+        # coordinates the trainer with the experience collectors
+        self.scheduler = TrainingScheduler(self.BATCH_SIZE, self.REPLAY_RATIO, self.MAX_TRAINING_LAG)
+        # functions receiving the online model's weights every MODEL_UPDATE_FREQUENCY steps
+        self.model_update_callbacks = []
+        # random stream for pre-training batches from stored experience
+        self.rng = np.random.default_rng(seed.spawn(1)[0] if seed is not None else None)
+
+        self.experience_writer = None
+        if self.RECORD_EXPERIENCE:
+            self.experience_writer = ExperienceWriter(f'experience/{self.logger.timestamp}', state_size,
+                                                      self.N_STEP_RETURNS, self.DISCOUNT_FACTOR)
+
+        if model_path is not None and is_checkpoint(model_path):
+            self.restore_checkpoint(model_path)
+
+        if self.NUMPY_INFERENCE:
+            # NumPy copy of the online model, refreshed every MODEL_UPDATE_FREQUENCY steps
+            self.policy = NumpyPolicy(self.model.get_weights())
+            self.model_update_callbacks.append(self._update_policy)
+        else:
+            # gathers states from all collectors into micro-batches for the online model
+            self.inference_server = InferenceServer(self.model.predict_on_batch, self.INFERENCE_BATCH_SIZE, self.INFERENCE_MAX_WAIT)
 
     def create_model(self, input_size, output_size):
         # define the model architecture
@@ -46,58 +127,181 @@ class UnoAgent:
         model.compile(loss='mse', optimizer='adam', metrics=['accuracy'])
         return model
 
+    def create_target_update(self, tau):
+        # target = tau * online + (1 - tau) * target for all weights
+        return tf.group(*[tf.assign(target, tau * online + (1 - tau) * target)
+                          for online, target in zip(self.model.weights, self.target_model.weights)])
+
     def update_replay_memory(self, transition):
         # add a state transition to the replay memory
-        self.replay_memory.append(transition)
+        self.replay_memory.append(*transition)
+        if self.experience_writer is not None:
+            # stored experience does not include legal masks
+            self.experience_writer.append(*transition[:5])
+        self.scheduler.add_transitions()
+
+    def update_replay_memory_batch(self, states, actions, rewards, next_states, dones, next_masks=None):
+        # add a batch of state transitions to the replay memory
+        self.replay_memory.extend(states, actions, rewards, next_states, dones, next_masks)
+        if self.experience_writer is not None:
+            self.experience_writer.extend(states, actions, rewards, next_states, dones)
+        self.scheduler.add_transitions(len(actions))
+
+    def load_experience(self, path, pretrain_steps=0):
+        dataset = ExperienceDataset(path)
+        if (dataset.n_steps, dataset.discount) != (self.N_STEP_RETURNS, self.DISCOUNT_FACTOR):
+            # the targets bootstrap with DISCOUNT_FACTOR ** N_STEP_RETURNS, other returns would be wrong
+            raise ValueError(f'Dataset at "{path}" was recorded with {dataset.n_steps}-step returns and discount {dataset.discount}, '
+                             f'not {self.N_STEP_RETURNS} and {self.DISCOUNT_FACTOR}')
+        print(f'Loaded {len(dataset)} stored transitions')
+
+        # train offline on minibatches read directly from the memory mapped dataset
+        for step in range(1, pretrain_steps + 1):
+            loss, acc = self.train_step(minibatch=dataset.sample(self.BATCH_SIZE, self.rng))
+            self.logger.scalar('pretrain_loss', loss)
+            self.update_target(step)
+            if step % self.MODEL_UPDATE_FREQUENCY == 0 or step == pretrain_steps:
+                self.publish_weights()
 
-    def predict(self, state):
+        # warm start the replay memory, the stored transitions do not count towards the replay ratio
+        filled = dataset.fill(self.replay_memory)
+        print(f'Warm started the replay memory with {filled} transitions')
+
+    def _update_policy(self, weights):
+        self.policy = NumpyPolicy(weights)
+
+    def predict(self, state, legal_mask=None):
         # return the index of the action with the highest predicted Q value
-        return np.argmax(self.model.predict(np.array(state).reshape(-1, *state.shape))[0])
+        with profiler.timer('inference'):
+            if self.NUMPY_INFERENCE:
+                return self.policy.predict(state, legal_mask)
+            return self.inference_server.predict(state, legal_mask)
+
+    def train_step(self, batch_size=None, minibatch=None):
+        if minibatch is None:
+            # get minibatch from replay memory, followed by the priority sampling indices and weights
+            with profiler.timer('replay_sample'):
+                minibatch = self.replay_memory.sample(batch_size or self.BATCH_SIZE)
+            transitions, extras = minibatch[:len(self.replay_memory.fields)], minibatch[len(self.replay_memory.fields):]
+        else:
+            transitions, extras = minibatch, ()
+        states, actions, rewards, next_states, dones = transitions[:5]
+        next_masks = transitions[5] if len(transitions) > 5 else None
+        batch_size = len(actions)
+        profiler.gauge('replay_fill', len(self.replay_memory) / self.replay_memory.capacity)
+
+        # predict online Q values for all states and next states in a single forward pass
+        with profiler.timer('train_predict'):
+            predictions = self.model.predict_on_batch(np.concatenate([states, next_states]))
+            target_future_q = self.target_model.predict_on_batch(next_states)
+        q_values, online_future_q = predictions[:batch_size], predictions[batch_size:]
+        batch_index = np.arange(batch_size)
+        predicted_q = q_values[batch_index, actions]
+
+        if next_masks is not None:
+            # only legal next actions can be selected
+            online_future_q = np.where(next_masks, online_future_q, -np.inf)
+            target_future_q = np.where(next_masks, target_future_q, -np.inf)
+        if self.DOUBLE_DQN:
+            # evaluate the online model's best next actions with the target model
+            future_q = target_future_q[batch_index, np.argmax(online_future_q, axis=1)]
+        else:
+            future_q = np.max(target_future_q, axis=1)
+
+        # update the Q values of the chosen actions with the n-step returns, adding the future reward
+        # discounted over n steps if the transition was not the last in an episode
+        q_values[batch_index, actions] = rewards + self.DISCOUNT_FACTOR ** self.N_STEP_RETURNS * np.where(dones, 0, future_q)
+
+        sample_weight = None
+        if self.PRIORITIZED_REPLAY and extras:
+            # update priorities with the TD errors and correct the sampling bias with importance weights
+            indices, sample_weight = extras
+            self.replay_memory.update_priorities(indices, q_values[batch_index, actions] - predicted_q)
+
+        # train the model on the minibatch
+        with profiler.timer('train_fit'):
+            loss, acc = self.model.train_on_batch(states, q_values, sample_weight=sample_weight)
+        return loss, acc
+
+    def save_checkpoint(self):
+        state = {'train_steps': self.train_steps,
+                 'initialized': self.initialized,
+                 'epsilon': self.epsilon,
+                 'transitions': self.scheduler.transitions,
+                 'scheduler_steps': self.scheduler.steps,
+                 'seed': self.seed_entropy}
+        replay = self.replay_memory.snapshot() if self.CHECKPOINT_REPLAY else None
+        with profiler.timer('checkpoint'):
+            return save_checkpoint(f'models/{self.logger.timestamp}', self.train_steps,
+                                   {'model': self.model, 'target_model': self.target_model},
+                                   state, replay, self.CHECKPOINTS_KEPT)
+
+    def restore_checkpoint(self, path):
+        state = load_checkpoint_state(path)
+        self.train_steps = state['train_steps']
+        self.epsilon = state['epsilon']
+        # collectors act with the restored online model right away
+        self.initialized = state['initialized']
+
+        replay = load_checkpoint_replay(path)
+        if replay is not None:
+            self.replay_memory.restore(replay)
+            # continue with the same replay ratio, without a restored replay memory the
+            # scheduler waits for new transitions before training
+            self.scheduler.transitions = state['transitions']
+            self.scheduler.steps = state['scheduler_steps']
+        print(f'Resumed from step {self.train_steps} with {len(self.replay_memory)} transitions')
+
+    def update_target(self, step):
+        # move the target model towards the online model
+        with profiler.timer('target_update'):
+            if self.TARGET_UPDATE_TAU is not None:
+                self.session.run(self.soft_target_update)
+            elif step % self.TARGET_UPDATE_FREQUENCY == 0:
+                self.session.run(self.hard_target_update)
+
+    def publish_weights(self):
+        # send the online model's weights to the NumPy policies (only copied to the host if anyone listens)
+        if self.model_update_callbacks:
+            weights = self.model.get_weights()
+            for callback in self.model_update_callbacks:
+                callback(weights)
+        if not self.initialized:
+            print('Agent initialized')
+            self.initialized = True
 
     def train(self):
-        counter = 0
         while True:
-            if len(self.replay_memory) < self.BATCH_SIZE:
-                # wait until enough data is collected
-                continue
-
-            # get minibatch from replay memory
-            minibatch = np.array(random.sample(self.replay_memory, self.BATCH_SIZE))
-
-            # get states from minibatch
-            states = np.array(list(minibatch[:,0]))
-            # predict Q values for all states in the minibatch
-            q_values = self.model.predict(states)
-            # estimate the maximum future reward
-            max_future_q = np.max(self.model.predict(np.array(list(minibatch[:,3]))), axis=1)
-
-            for i in range(len(minibatch)):
-                action, reward, done = minibatch[i,1], minibatch[i,2], minibatch[i,4]
-
-                # update the Q value of the chosen action
-                q_values[i,action] = reward
-                if not done:
-                    # add the discounted maximum future reward if the current transition was not the last in an episode
-                    q_values[i,action] += self.DISCOUNT_FACTOR * max_future_q[i]
-
-            # train the model on the minibatch
-            hist = self.target_model.fit(x=states, y=q_values, batch_size=self.BATCH_SIZE, verbose=0)
-            self.logger.scalar('loss', hist.history['loss'][0])
-            self.logger.scalar('acc', hist.history['acc'][0])
-            self.logger.flush()
-
-            counter += 1
-            if counter % self.MODEL_UPDATE_FREQUENCY == 0:
-                # update the predictor model
-                self.model.set_weights(self.target_model.get_weights())
-                if not self.initialized:
-                    print('Agent initialized')
-                    self.initialized = True
-
-            if counter % self.MODEL_SAVE_FREQUENCY == 0:
+            # wait until enough data is collected and the replay ratio allows another step
+            with profiler.timer('trainer_wait'):
+                self.scheduler.wait_for_step()
+
+            loss, acc = self.train_step()
+            self.logger.scalar('loss', loss)
+            self.logger.scalar('acc', acc)
+            self.scheduler.step_done()
+
+            self.train_steps += 1
+            self.update_target(self.train_steps)
+            if self.train_steps % self.RATE_LOG_FREQUENCY == 0:
+                # log the relative speed of experience collection and training
+                transition_rate, step_rate = self.scheduler.rates()
+                self.logger.scalar('transitions_per_second', transition_rate)
+                self.logger.scalar('train_steps_per_second', step_rate)
+                self.logger.scalar('replay_ratio', step_rate / max(transition_rate, 1e-9))
+                # total environment steps to compare the sample efficiency of training settings
+                self.logger.scalar('env_steps', self.scheduler.transitions)
+            if self.train_steps % self.MODEL_UPDATE_FREQUENCY == 0:
+                self.publish_weights()
+
+            if self.train_steps % self.MODEL_SAVE_FREQUENCY == 0:
                 # create model folder
                 folder = f'models/{self.logger.timestamp}'
                 if not os.path.exists(folder):
                     os.makedirs(folder)
-                # save model
-                self.model.save(f'{folder}/model-{counter}.h5')
\ No newline at end of file
+                # save model and its NumPy export
+                self.model.save(f'{folder}/model-{self.train_steps}.h5')
+                export_model(self.model, f'{folder}/model-{self.train_steps}.npz')
+
+            if self.train_steps % self.CHECKPOINT_FREQUENCY == 0:
+                self.save_checkpoint()
\ No newline at end of file
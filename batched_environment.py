@@ -0,0 +1,207 @@
+import numpy as np
+from environment import UnoEnvironment
+
+
+class BatchedUnoEnvironment:
+
+    ILLEGAL_MOVE_REWARD = UnoEnvironment.ILLEGAL_MOVE_REWARD
+    DRAW_CARD_REWARD = UnoEnvironment.DRAW_CARD_REWARD
+    CARD_PLAYED_REWARD = UnoEnvironment.CARD_PLAYED_REWARD
+    PLAYER_FINISHED_REWARD = UnoEnvironment.PLAYER_FINISHED_REWARD
+
+    NUM_COLOURS = UnoEnvironment.NUM_COLOURS
+    NUM_CARDS = len(UnoEnvironment.CARD_TYPES)
+    DRAW_ACTION = NUM_CARDS
+
+    NUM_TYPES = UnoEnvironment.NUM_TYPES
+    NO_COLOUR = UnoEnvironment.NO_COLOUR
+    CARD_COLOURS = UnoEnvironment.CARD_COLOURS.astype(np.int64)
+    CARD_VALUES = UnoEnvironment.CARD_VALUES.astype(np.int64)
+    LEGAL_ACTIONS = UnoEnvironment.LEGAL_ACTIONS
+    # player status of cards played without effect while cards have to be drawn
+    IGNORED_CARD = 3
+
+    def __init__(self, num_envs, player_count, seed=None):
+        self.num_envs = num_envs
+        self.player_count = player_count
+        self.rng = np.random.default_rng(seed)
+        self._rows = np.arange(num_envs)
+        self._seats = np.arange(player_count)
+
+        # game state of all environments as contiguous arrays
+        self.hands = np.zeros((num_envs, player_count, self.NUM_CARDS), dtype=np.int32)
+        self.active = np.zeros((num_envs, player_count), dtype=bool)
+        self.top_colour = np.zeros(num_envs, dtype=np.int64)
+        self.top_type = np.zeros(num_envs, dtype=np.int64)
+        self.to_draw = np.zeros(num_envs, dtype=np.int64)
+        self.turn = np.zeros(num_envs, dtype=np.int64)
+        self.turn_direction = np.ones(num_envs, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            # reset all environments
+            mask = np.ones(self.num_envs, dtype=bool)
+        rows = self._rows[mask]
+        if len(rows) == 0:
+            return self.get_state()
+
+        # initialize players
+        self.hands[rows] = 0
+        self.active[rows] = True
+        self._draw_cards(np.repeat(rows, self.player_count),
+                         np.tile(np.arange(self.player_count), len(rows)),
+                         np.full(len(rows) * self.player_count, 7))
+
+        # initialize card stack
+        top_cards = self.rng.integers(self.NUM_CARDS, size=len(rows))
+        self.top_colour[rows] = self.CARD_COLOURS[top_cards]
+        self.top_type[rows] = self.CARD_VALUES[top_cards]
+        wild = self.top_colour[rows] == self.NO_COLOUR
+        self.top_colour[rows[wild]] = self.rng.integers(self.NUM_COLOURS, size=wild.sum())
+        self.to_draw[rows] = 0
+
+        # initialize turns
+        self.turn[rows] = 0
+        self.turn_direction[rows] = 1
+        return self.get_state()
+
+    def step(self, actions):
+        rows = self._rows
+        actions = np.asarray(actions, dtype=np.int64)
+        seat = self.turn.copy()
+        rewards = np.zeros(self.num_envs)
+
+        # get cards selected by the players (the draw action is mapped to card 0 and masked out)
+        is_draw = actions == self.DRAW_ACTION
+        cards = np.where(is_draw, 0, actions)
+        colours = self.CARD_COLOURS[cards]
+        types = self.CARD_VALUES[cards]
+
+        legal = self.legal_moves(actions)
+        pending = self.to_draw > 0
+        illegal = ~legal
+        drawn = legal & is_draw
+        played = legal & ~is_draw
+
+        # draw cards: either from previous 2+ or 4+ card(s) or a single card
+        draw_counts = np.where(pending, self.to_draw, 1)
+        self._draw_cards(rows[drawn], seat[drawn], draw_counts[drawn])
+        self.to_draw[drawn] = 0
+
+        # player adds 2+ or 4+ card to existing
+        stacked = played & pending & (types == self.top_type) & ((types == 11) | (types == 14))
+        self.to_draw[stacked] += np.where(types[stacked] == 11, 2, 4)
+        # cards played while cards have to be drawn after an illegal move replaced the 2+ or 4+ card have no effect
+        ignored = played & pending & ~stacked
+
+        # apply the effect of cards played without pending draws
+        fresh = played & ~pending
+        reverse = fresh & (types == 10)
+        skip = fresh & (types == 12)
+        self.turn_direction[reverse] *= -1
+        self.to_draw[fresh & (types == 11)] = 2
+        self.to_draw[fresh & (types == 14)] = 4
+        wild = fresh & (types >= 13)
+        colours[wild] = self.rng.integers(self.NUM_COLOURS, size=wild.sum())
+
+        # -1: illegal move, 0: draw card, 1: play card, 2: win,
+        # IGNORED_CARD: card without effect (None in UnoEnvironment)
+        player_status = np.where(illegal, -1, np.where(drawn, 0, np.where(ignored, self.IGNORED_CARD, 1)))
+        rewards[illegal] += self.ILLEGAL_MOVE_REWARD
+        rewards[drawn] += self.DRAW_CARD_REWARD
+        rewards[played & ~ignored] += self.CARD_PLAYED_REWARD
+
+        # UnoPlayer.play_card re-checks legality after to_draw was updated, which keeps the card in the hand
+        # when a 2+ is played on a 4+ (or vice versa) whose cards were already drawn
+        kept = (self.to_draw > 0) & (((self.top_type == 11) & (types != 11)) | ((self.top_type == 14) & (types != 14)))
+        consumed = played & ~ignored & ~kept
+        self.hands[rows[consumed], seat[consumed], cards[consumed]] -= 1
+
+        # player has no cards left -> win
+        finished = ~illegal & (self.hands[rows, seat].sum(axis=1) == 0)
+        player_status[finished] = 2
+        rewards[finished] += self.PLAYER_FINISHED_REWARD
+
+        # update top card with the card played by the player (also for illegal moves, as in UnoEnvironment)
+        self.top_colour[~is_draw] = colours[~is_draw]
+        self.top_type[~is_draw] = types[~is_draw]
+
+        # index of the player in the list of remaining players, as reported by UnoEnvironment
+        turn_index = (self.active & (self._seats < seat[:, None])).sum(axis=1)
+
+        # skip the next player
+        skipped = np.where(skip, self._next_seat(seat), seat)
+        # remove eliminated and finished players
+        removed = illegal | finished
+        self.active[rows[removed], seat[removed]] = False
+        # advance to the next turn
+        self.turn = self._next_seat(skipped)
+        # UnoEnvironment loses the skip if a player finishes with a skip card which wraps around the player list
+        lost_skip = finished & skip & ((skipped - seat) * self.turn_direction < 0)
+        self.turn[lost_skip] = skipped[lost_skip]
+
+        # check if the end of the episode was reached (only one player left)
+        dones = self.active.sum(axis=1) <= 1
+        states = self.get_state()
+        info = {'turn': turn_index, 'seat': seat, 'player': player_status}
+
+        if dones.any():
+            # automatically reset finished games and keep their final observations
+            info['final_state'] = states[dones]
+            states[dones] = self.reset(dones)[dones]
+        return states, rewards, dones, info
+
+    def legal_moves(self, actions):
+        rows = self._rows
+        actions = np.asarray(actions, dtype=np.int64)
+
+        # look up the compatibility of the selected actions with the top cards
+        legal = self.LEGAL_ACTIONS[(self.to_draw > 0).astype(np.int64), self._top_cards(), actions]
+        # the current player has to own the selected card (drawing a card is always legal)
+        is_draw = actions == self.DRAW_ACTION
+        owned = self.hands[rows, self.turn, np.where(is_draw, 0, actions)] > 0
+        return legal & (is_draw | owned)
+
+    def legal_action_mask(self):
+        # look up the compatibility with the top cards and combine it with the hands of the current players
+        mask = self.LEGAL_ACTIONS[(self.to_draw > 0).astype(np.int64), self._top_cards()]
+        mask[:, :-1] &= self.hands[self._rows, self.turn] > 0
+        return mask
+
+    def get_state(self):
+        states = np.empty((self.num_envs, self.state_size()), dtype=np.float32)
+
+        # look up the top card section of the state vectors
+        states[:, UnoEnvironment.STATE_TOP_CARD] = UnoEnvironment.TOP_CARD_STATES[self._top_cards()]
+        # cards of the players that have the turn
+        states[:, UnoEnvironment.STATE_CARDS] = self.hands[self._rows, self.turn]
+        # how many cards the next player has to draw (due to 2+ or 4+ cards)
+        states[:, UnoEnvironment.STATE_TO_DRAW] = self.to_draw
+        return states
+
+    def _top_cards(self):
+        # index of the top cards in the LEGAL_ACTIONS table
+        return self.top_colour * self.NUM_TYPES + self.top_type
+
+    def _next_seat(self, seat):
+        # find the closest active seat in the turn direction
+        offsets = np.arange(1, self.player_count + 1)
+        candidates = (seat[:, None] + self.turn_direction[:, None] * offsets) % self.player_count
+        first_active = np.argmax(self.active[self._rows[:, None], candidates], axis=1)
+        return candidates[self._rows, first_active]
+
+    def _draw_cards(self, rows, seats, counts):
+        # draw all requested cards randomly with a single RNG call
+        cards = self.rng.integers(self.NUM_CARDS, size=counts.sum())
+        np.add.at(self.hands, (np.repeat(rows, counts), np.repeat(seats, counts), cards), 1)
+
+    def state_size(self):
+        return UnoEnvironment.STATE_SIZE
+
+    def action_count(self):
+        return self.NUM_CARDS + 1
+
+    def players_left(self):
+        return self.active.sum(axis=1)
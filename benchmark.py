@@ -0,0 +1,186 @@
+import sys
+import json
+import time
+import platform
+import subprocess
+import numpy as np
+from datetime import datetime
+from environment import UnoEnvironment
+from batched_environment import BatchedUnoEnvironment
+from replay_memory import ReplayMemory, PrioritizedReplayMemory
+from numpy_policy import NumpyPolicy
+
+SEED = 0
+PLAYER_COUNTS = [2, 4, 6, 8, 10]
+REPLAY_CAPACITIES = [10000, 100000, 1000000]
+TRAIN_BATCH_SIZES = [64, 256, 512, 1024]
+BATCHED_ENV_SIZES = [1, 64, 1024]
+MODEL_PATH = 'example_model.npz'
+
+STEPS = 20000
+REPLAY_OPERATIONS = 2000
+TRAIN_STEPS = 20
+GAMES = 200
+
+
+def measure(function, repeats):
+    # return the mean time per call in microseconds and calls per second
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    elapsed = time.perf_counter() - start
+    return {'us_per_call': elapsed / repeats * 1e6, 'calls_per_second': repeats / elapsed}
+
+
+def benchmark_environment():
+    results = {}
+    for player_count in PLAYER_COUNTS:
+        np.random.seed(SEED)
+        env = UnoEnvironment(player_count, seed=SEED)
+
+        # step with legal random actions, resetting finished games
+        def step():
+            _, _, done, _ = env.step(np.random.choice(np.flatnonzero(env.legal_action_mask())))
+            if done:
+                env.reset()
+
+        results[player_count] = {
+            'reset': measure(env.reset, STEPS // 10),
+            'step': measure(step, STEPS),
+            'get_state': measure(env.get_state, STEPS),
+            'legal_move': measure(lambda: env.legal_move(np.random.randint(env.action_count())), STEPS),
+            'legal_action_mask': measure(env.legal_action_mask, STEPS),
+        }
+    return results
+
+
+def benchmark_batched_environment():
+    results = {}
+    for num_envs in BATCHED_ENV_SIZES:
+        np.random.seed(SEED)
+        env = BatchedUnoEnvironment(num_envs, 4, seed=SEED)
+
+        # step all environments with random legal actions
+        def step():
+            mask = env.legal_action_mask()
+            env.step(np.argmax(mask * np.random.sample(mask.shape), axis=1))
+
+        repeats = max(STEPS // num_envs, 20)
+        result = measure(step, repeats)
+        result['env_steps_per_second'] = result['calls_per_second'] * num_envs
+        results[num_envs] = result
+    return results
+
+
+def benchmark_replay():
+    results = {}
+    state_size = UnoEnvironment.STATE_SIZE
+    state = np.random.sample(state_size).astype(np.float32)
+    for capacity in REPLAY_CAPACITIES:
+        for name, memory_class in (('uniform', ReplayMemory), ('prioritized', PrioritizedReplayMemory)):
+            np.random.seed(SEED)
+            memory = memory_class(capacity, state_size, seed=SEED)
+
+            # fill the memory with random transitions in chunks
+            chunk = 1000
+            states = np.random.sample((chunk, state_size)).astype(np.float32)
+            for _ in range(capacity // chunk):
+                memory.extend(states, np.random.randint(55, size=chunk), np.random.sample(chunk), states, np.zeros(chunk, dtype=bool))
+
+            results[f'{name}_{capacity}'] = {
+                'append': measure(lambda: memory.append(state, 0, 0.0, state, False), REPLAY_OPERATIONS),
+                'sample_512': measure(lambda: memory.sample(512), REPLAY_OPERATIONS // 10),
+            }
+    return results
+
+
+def benchmark_training():
+    try:
+        from agent import UnoAgent
+    except ImportError as error:
+        return {'skipped': str(error)}
+
+    class BenchmarkAgent(UnoAgent):
+        LOG_SINKS = []
+        REPLAY_MEMORY_SIZE = max(TRAIN_BATCH_SIZES) * 4
+
+    np.random.seed(SEED)
+    agent = BenchmarkAgent(UnoEnvironment.STATE_SIZE, len(UnoEnvironment.CARDS) + 1, seed=np.random.SeedSequence(SEED))
+    count = agent.REPLAY_MEMORY_SIZE
+    states = np.random.sample((count, UnoEnvironment.STATE_SIZE)).astype(np.float32)
+    agent.update_replay_memory_batch(states, np.random.randint(55, size=count), np.random.sample(count), states, np.zeros(count, dtype=bool))
+
+    results = {}
+    for batch_size in TRAIN_BATCH_SIZES:
+        # warm up before measuring the train step
+        agent.train_step(batch_size)
+        results[batch_size] = measure(lambda: agent.train_step(batch_size), TRAIN_STEPS)
+
+    # cost of the in-graph target model update compared to copying the weights through NumPy
+    updates = {
+        'soft_assign': lambda: agent.session.run(agent.soft_target_update),
+        'hard_assign': lambda: agent.session.run(agent.hard_target_update),
+        'host_copy': lambda: agent.target_model.set_weights(agent.model.get_weights()),
+    }
+    results['target_update'] = {}
+    for name, update in updates.items():
+        # warm up, the first run of an op also prepares its part of the graph
+        update()
+        results['target_update'][name] = measure(update, TRAIN_STEPS)
+    return results
+
+
+def benchmark_self_play():
+    results = {}
+    policies = {'random': None, 'model': NumpyPolicy.load(MODEL_PATH)}
+    for name, policy in policies.items():
+        np.random.seed(SEED)
+        env = UnoEnvironment(4, seed=SEED)
+        steps = 0
+
+        start = time.perf_counter()
+        for _ in range(GAMES):
+            env.reset()
+            done = False
+            while not done:
+                mask = env.legal_action_mask()
+                if policy is None:
+                    action = np.random.choice(np.flatnonzero(mask))
+                else:
+                    action = policy.predict(env.get_state(), mask)
+                _, _, done, _ = env.step(action)
+                steps += 1
+        elapsed = time.perf_counter() - start
+        results[name] = {'games_per_second': GAMES / elapsed, 'steps_per_second': steps / elapsed}
+    return results
+
+
+def commit_hash():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+BENCHMARKS = {
+    'environment': benchmark_environment,
+    'batched_environment': benchmark_batched_environment,
+    'replay': benchmark_replay,
+    'training': benchmark_training,
+    'self_play': benchmark_self_play,
+}
+
+if __name__ == '__main__':
+    # usage: python benchmark.py [output.json] [benchmark names...]
+    output_path = sys.argv[1] if len(sys.argv) > 1 else f'benchmark-{datetime.now().strftime("%y-%m-%d_%H-%M-%S")}.json'
+    names = sys.argv[2:] or list(BENCHMARKS)
+
+    results = {'commit': commit_hash(), 'time': datetime.now().isoformat(), 'seed': SEED,
+               'python': platform.python_version(), 'numpy': np.__version__, 'benchmarks': {}}
+    for name in names:
+        print(f'Running {name} benchmark...')
+        results['benchmarks'][name] = BENCHMARKS[name]()
+
+    with open(output_path, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f'Results written to {output_path}')
@@ -0,0 +1,60 @@
+import os
+import json
+import shutil
+import numpy as np
+
+
+def save_checkpoint(folder, step, models, state, replay=None, keep=2):
+    # write the checkpoint into a temporary folder first
+    path = f'{folder}/checkpoint-{step}'
+    temp_path = f'{path}.tmp'
+    for old_path in (temp_path, path):
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+    os.makedirs(temp_path)
+
+    for name, model in models.items():
+        # includes the optimizer state
+        model.save(f'{temp_path}/{name}.h5')
+    with open(f'{temp_path}/state.json', 'w') as file:
+        json.dump(state, file, indent=2)
+    if replay is not None:
+        np.savez(f'{temp_path}/replay.npz', **replay)
+
+    # the complete checkpoint becomes visible with a single rename, then the latest pointer is replaced
+    os.replace(temp_path, path)
+    with open(f'{folder}/latest.tmp', 'w') as file:
+        file.write(os.path.basename(path))
+    os.replace(f'{folder}/latest.tmp', f'{folder}/latest')
+
+    # only keep the most recent checkpoints
+    checkpoints = sorted((name for name in os.listdir(folder) if name.startswith('checkpoint-') and not name.endswith('.tmp')),
+                         key=lambda name: int(name.split('-')[1]))
+    for name in checkpoints[:-keep]:
+        shutil.rmtree(f'{folder}/{name}')
+    return path
+
+
+def resolve_checkpoint(path):
+    # accept a models/<timestamp> folder, which points to its latest checkpoint, or a checkpoint folder
+    if os.path.exists(f'{path}/latest'):
+        with open(f'{path}/latest') as file:
+            return f'{path}/{file.read().strip()}'
+    return path
+
+
+def is_checkpoint(path):
+    return os.path.isdir(path) and os.path.exists(f'{resolve_checkpoint(path)}/state.json')
+
+
+def load_checkpoint_state(path):
+    with open(f'{resolve_checkpoint(path)}/state.json') as file:
+        return json.load(file)
+
+
+def load_checkpoint_replay(path):
+    path = f'{resolve_checkpoint(path)}/replay.npz'
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as replay:
+        return dict(replay)
@@ -0,0 +1,83 @@
+import numpy as np
+from profiler import profiler
+from random_blocks import BlockRandom
+from transitions import SeatTransitions
+from league import OpponentPool
+
+
+def run_episodes(env, rng, act, initialized, emit, episode_done, epsilon_settings, return_settings, masked_actions=False,
+                 league_settings=None):
+    # act(state, legal_mask) returns the policy's action, initialized() tells whether the policy can act yet,
+    # emit receives the completed transitions and episode_done the metrics of every finished episode
+    epsilon, epsilon_decay, min_epsilon = epsilon_settings
+
+    # the collector's random streams for epsilon rolls and random actions
+    random_rolls = BlockRandom(rng)
+    random_actions = BlockRandom(rng, env.action_count())
+    # assembles n-step transitions from the observations of each seat
+    n_steps, discount = return_settings
+    seat_transitions = SeatTransitions(env.player_count, n_steps, discount, env.state_size())
+    # the current and the next observation alternate between two preallocated buffers
+    observations = np.zeros((2, env.state_size()), dtype=np.float32)
+    buffer = 0
+
+    # frozen opponents of the league (loaded once by this collector), only the learner's seats are recorded
+    opponent_pool = None
+    opponents = np.full(env.player_count, -1)
+    if league_settings is not None and league_settings[0] > 0:
+        league_seats, checkpoints, pool_size, include_naive, refresh_episodes = league_settings
+        opponent_pool = OpponentPool(checkpoints, pool_size, env.state_size(), env.action_count(), include_naive)
+
+    episode = 0
+    while True:
+        done = False
+        state = env.get_state(observations[buffer])
+        legal_mask = env.legal_action_mask() if masked_actions else None
+        if opponent_pool is not None:
+            if episode % refresh_episodes == 0:
+                opponent_pool.refresh()
+            opponents = opponent_pool.choose_opponents(rng, env.player_count, league_seats)
+        seat_transitions.reset(opponents < 0)
+        episode += 1
+
+        rewards = []
+        # run one episode (until only frozen opponents are left)
+        while not done and seat_transitions.recording():
+            opponent = opponents[seat_transitions.seats[env.turn]]
+            if opponent >= 0:
+                # the seat is played by a frozen opponent
+                action = opponent_pool.act(opponent, state, env.legal_action_mask() if legal_mask is None else legal_mask)
+            elif random_rolls.next() < epsilon or not initialized():
+                if legal_mask is None:
+                    # choose a random action
+                    action = random_actions.next()
+                else:
+                    # choose a random legal action
+                    legal_actions = np.flatnonzero(legal_mask)
+                    action = legal_actions[int(random_rolls.next() * len(legal_actions))]
+            else:
+                # choose an action from the policy
+                action = act(state, legal_mask)
+
+            buffer = 1 - buffer
+            with profiler.timer('env_step'):
+                new_state, reward, done, step_info = env.step(action, out=observations[buffer])
+            if legal_mask is not None:
+                legal_mask = env.legal_action_mask()
+
+            # pass on the transitions completed by this step
+            seat_transitions.step(state, action, reward, new_state, done, legal_mask, step_info, env.turn, emit)
+            state = new_state
+
+            if opponent < 0:
+                # episode metrics and exploration only follow the learner's own turns
+                rewards.append(reward)
+                if initialized():
+                    # decay epsilon
+                    epsilon *= epsilon_decay
+                    epsilon = max(epsilon, min_epsilon)
+
+        episode_done(np.sum(rewards), np.mean(rewards), len(rewards), epsilon)
+
+        # reset the environment for the next episode
+        env.reset()
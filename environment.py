@@ -1,4 +1,38 @@
 import numpy as np
+from random_blocks import BlockRandom
+
+
+def _legal_action_table(card_types, num_colours, num_types):
+    card_colours, card_values = card_types[:, 0], card_types[:, 1]
+
+    # enumerate all top cards as colour * num_types + type (including the uncoloured colour index)
+    top_colours = np.repeat(np.arange(num_colours + 1), num_types)[:, None]
+    top_types = np.tile(np.arange(num_types), num_colours + 1)[:, None]
+
+    # cards matching the top card by colour or type, wild and 4+ cards are always playable
+    matches = (card_values >= 13) | (top_colours == card_colours) | (top_types == card_values)
+    # after 2+ or 4+ cards, only the same card type can be played until the cards were drawn
+    blocked = ((top_types == 11) & (card_values != 11)) | ((top_types == 14) & (card_values != 14))
+
+    # table indexed by [cards to draw > 0, top card, action] where drawing a card is always legal
+    table = np.ones((2, len(top_colours), len(card_types) + 1), dtype=bool)
+    table[0, :, :-1] = matches
+    table[1, :, :-1] = matches & ~blocked
+    return table
+
+
+def _top_card_state_table(num_colours, num_types, colour_one_hot):
+    # state vector section of every top card indexed by colour * num_types + type
+    table = np.zeros(((num_colours + 1) * num_types, 13 * num_colours + 2 * num_colours), dtype=np.float32)
+    for colour in range(num_colours + 1):
+        row = colour * num_types
+        if colour < num_colours:
+            # one hot vector of all cards excluding wild card and 4+ card
+            table[row + np.arange(13), colour * 13 + np.arange(13)] = 1
+        # colour of wild card and 4+ card on top of the stack
+        table[row + 13, 13 * num_colours:14 * num_colours] = colour_one_hot[colour]
+        table[row + 14, 14 * num_colours:15 * num_colours] = colour_one_hot[colour]
+    return table
 
 
 class UnoEnvironment:
@@ -9,31 +43,99 @@ class UnoEnvironment:
     PLAYER_FINISHED_REWARD = 10
 
     NUM_COLOURS = 4
+    # number of distinct card types (0-9, reverse, 2+, skip, wild, 4+)
+    NUM_TYPES = 15
+    # colour index of wild and 4+ cards before a colour was chosen
+    NO_COLOUR = NUM_COLOURS
 
-    # generate all possible cards as tuples with the structure (colour:int, type:int)
+    # generate all possible cards as rows with the structure (colour:int, type:int)
     CARD_TYPES = [[colour, type] for colour in range(NUM_COLOURS) for type in range(13)]
-    CARD_TYPES += [[None, 13], [None, 14]]
-    CARD_TYPES = np.array(CARD_TYPES)
-
-    def __init__(self, player_count):
+    CARD_TYPES += [[NO_COLOUR, 13], [NO_COLOUR, 14]]
+    CARD_TYPES = np.array(CARD_TYPES, dtype=np.int8)
+    CARD_COLOURS = CARD_TYPES[:, 0]
+    CARD_VALUES = CARD_TYPES[:, 1]
+    # the same cards as tuples of Python ints for cheap scalar lookups
+    CARDS = list(map(tuple, CARD_TYPES.tolist()))
+
+    # one hot colour vectors, uncoloured cards set all entries
+    COLOUR_ONE_HOT = np.concatenate([np.eye(NUM_COLOURS), np.ones((1, NUM_COLOURS))])
+
+    # precomputed legality of every action for each top card, independent of the player's hand
+    LEGAL_ACTIONS = _legal_action_table(CARD_TYPES, NUM_COLOURS, NUM_TYPES)
+
+    # layout of the state vector (current top card, own cards, amount to draw)
+    TOP_CARD_STATES = _top_card_state_table(NUM_COLOURS, NUM_TYPES, COLOUR_ONE_HOT)
+    STATE_TOP_CARD = slice(0, TOP_CARD_STATES.shape[1])
+    STATE_CARDS = slice(STATE_TOP_CARD.stop, STATE_TOP_CARD.stop + len(CARDS))
+    STATE_TO_DRAW = STATE_CARDS.stop
+    STATE_SIZE = STATE_TO_DRAW + 1
+    # optional histogram of the cards remaining in a finite draw pile
+    STATE_DECK = slice(STATE_SIZE, STATE_SIZE + len(CARDS))
+
+    def __init__(self, player_count, finite_deck=False, deck_features=False, seed=None):
+        if deck_features and not finite_deck:
+            raise ValueError('Deck features require a finite deck')
         self.player_count = player_count
+        self.deck_features = deck_features
+
+        # random number generator of this environment (seed can be an int, SeedSequence or Generator)
+        self.rng = np.random.default_rng(seed)
+        # pre-generated random cards and colours
+        self.random_cards = BlockRandom(self.rng, len(self.CARDS))
+        self.random_colours = BlockRandom(self.rng, self.NUM_COLOURS)
+
+        # draw cards from a shuffled 108 card deck instead of sampling them with replacement
+        self.deck = UnoDeck(self.rng) if finite_deck else None
+        # index of the top card in CARDS if it was played from a hand and can be recycled
+        self.top_card_index = None
+
+        # preallocated observation buffer for every player, updated whenever the game state changes
+        state_size = self.STATE_DECK.stop if deck_features else self.STATE_SIZE
+        self.states = np.zeros((player_count, state_size), dtype=np.float32)
         self.reset()
 
     def reset(self):
         # initialize players
-        self.players = [UnoPlayer(self, num_cards=7) for _ in range(self.player_count)]
+        self.states.fill(0)
+        if self.deck is not None:
+            self.deck.reset()
+        self.players = [UnoPlayer(self, num_cards=7, state=self.states[i]) for i in range(self.player_count)]
 
         # initialize card stack
-        self.top_card = self.CARD_TYPES[np.random.randint(len(self.CARD_TYPES))]
-        if self.top_card[0] is None:
-            self.top_card[0] = np.random.randint(0, 4)
+        if self.deck is None:
+            self.top_card = self.CARDS[self.random_cards.next()]
+        else:
+            self.top_card_index = self.draw(1)[0]
+            self.top_card = self.CARDS[self.top_card_index]
+        if self.top_card[0] == self.NO_COLOUR:
+            self.top_card = (self.random_colours.next(), self.top_card[1])
         self.to_draw = 0
 
         # initialize turns
         self.turn = 0
         self.turn_direction = 1
 
-    def step(self, action):
+    @property
+    def top_card(self):
+        return self._top_card
+
+    @top_card.setter
+    def top_card(self, card):
+        # update the top card section of all observations
+        self._top_card = card
+        self.states[:, self.STATE_TOP_CARD] = self.TOP_CARD_STATES[card[0] * self.NUM_TYPES + card[1]]
+
+    @property
+    def to_draw(self):
+        return self._to_draw
+
+    @to_draw.setter
+    def to_draw(self, to_draw):
+        # update the amount to draw in all observations
+        self._to_draw = to_draw
+        self.states[:, self.STATE_TO_DRAW] = to_draw
+
+    def step(self, action, out=None):
         reward = 0
         turn_index = self.turn
 
@@ -42,11 +144,13 @@ class UnoEnvironment:
 
         # retrieve current player instance
         player = self.players[self.turn]
+        # card removed from the player's hand (False if the card stays in the hand)
+        removed_card = False
 
         # get card selected by player (None => draw card)
         played_card = None
-        if action < len(self.CARD_TYPES):
-            played_card = self.CARD_TYPES[action].copy()
+        if action < len(self.CARDS):
+            played_card = self.CARDS[action]
 
         if self.legal_move(action):
             if self.to_draw > 0:
@@ -81,12 +185,12 @@ class UnoEnvironment:
                 player_status = 1
             elif played_card[1] == 13:
                 # wild card
-                played_card[0] = np.random.randint(self.NUM_COLOURS)
+                played_card = (self.random_colours.next(), 13)
                 player_status = 1
             elif played_card[1] == 14:
                 # 4+ card
                 self.to_draw = 4
-                played_card[0] = np.random.randint(self.NUM_COLOURS)
+                played_card = (self.random_colours.next(), 14)
                 player_status = 1
             else:
                 # play ordinary (0-9) card
@@ -102,7 +206,7 @@ class UnoEnvironment:
             reward += self.DRAW_CARD_REWARD
         elif player_status == 1:
             reward += self.CARD_PLAYED_REWARD
-            player.play_card(action, played_card[0])
+            removed_card = player.play_card(action, played_card[0])
 
         if player.num_cards() == 0:
             # player has no cards left -> win
@@ -111,6 +215,11 @@ class UnoEnvironment:
             self._remove_player(player)
 
         if played_card is not None:
+            if self.deck is not None:
+                # the covered card goes to the discard pile if it came from a hand
+                if self.top_card_index is not None:
+                    self.deck.discard(self.top_card_index)
+                self.top_card_index = action if removed_card else None
             # update top card with the card played by the player
             self.top_card = played_card
 
@@ -119,35 +228,16 @@ class UnoEnvironment:
         # check if the end of the episode was reached (only one player left)
         done = len(self.players) <= 1
 
-        return self.get_state(), reward, done, {'turn': turn_index, 'player': player_status}
-
-    def get_state(self):
-        # all cards excluding wild card and 4+ card
-        coloured_cards = np.all(self.CARD_TYPES[:-2] == self.top_card, axis=1).astype(np.float)
-
-        # one hot vector indicating colour of wild card on top of the stack
-        wild_card = np.zeros(self.NUM_COLOURS)
-        if self.top_card[1] == 13:
-            wild_card[self.top_card[0]] = 1
+        return self.get_state(out), reward, done, {'turn': turn_index, 'player': player_status}
 
-        # one hot vector indicating colour of 4+ card on top of the stack
-        draw_4_card = np.zeros(self.NUM_COLOURS)
-        if self.top_card[1] == 14:
-            draw_4_card[self.top_card[0]] = 1
-
-        # player cards
-        player_cards = self.players[self.turn].cards
-
-        # how many cards the next player has to draw (due to 2+ or 4+ cards)
-        to_draw_info = [self.to_draw]
-
-        # generate state vector (current top card, own cards, amount to draw)
-        states = [coloured_cards,
-                  wild_card,
-                  draw_4_card,
-                  player_cards,
-                  to_draw_info]
-        return np.concatenate(states)
+    def get_state(self, out=None):
+        # the observation of the current player is kept up to date by the setters and the player's hand
+        state = self.players[self.turn].state
+        if out is None:
+            return state.copy()
+        # write the observation into a caller-supplied buffer
+        out[:] = state
+        return out
 
     def _next_turn(self):
         # advance to the next turn
@@ -165,11 +255,11 @@ class UnoEnvironment:
             player = self.players[self.turn]
 
         # drawing a card is always legal
-        if action == len(self.CARD_TYPES):
+        if action == len(self.CARDS):
             return True
 
         # retrieve selected card information
-        card = self.CARD_TYPES[action]
+        card = self.CARDS[action]
 
         # illegal move if the current player does not have the selected card
         if player.cards[action] == 0:
@@ -187,16 +277,37 @@ class UnoEnvironment:
         # return true if the last and current card's colour or type are equal
         return self.top_card[0] == card[0] or self.top_card[1] == card[1]
 
+    def legal_action_mask(self, player=None):
+        if player is None:
+            # get player that currently has the turn
+            player = self.players[self.turn]
+
+        # combine the compatibility with the top card with the cards in the player's hand
+        top_card = self.top_card[0] * self.NUM_TYPES + self.top_card[1]
+        mask = self.LEGAL_ACTIONS[int(self.to_draw > 0), top_card].copy()
+        mask[:-1] &= player.cards > 0
+        return mask
+
+    def draw(self, count):
+        # draw cards from the finite deck and update the deck histogram in the observations
+        cards = self.deck.draw(count)
+        if self.deck_features:
+            self.states[:, self.STATE_DECK] = self.deck.remaining
+        return cards
+
     def _remove_player(self, player):
         self.players.remove(player)
+        if self.deck is not None:
+            # cards of eliminated players go to the discard pile
+            self.deck.discarded += player.cards
         if self.turn_direction == 1:
             self.turn -= 1
 
     def state_size(self):
-        return len(self.get_state())
+        return self.states.shape[1]
 
     def action_count(self):
-        return len(self.CARD_TYPES) + 1
+        return len(self.CARDS) + 1
 
     def players_left(self):
         return len(self.players)
@@ -204,17 +315,40 @@ class UnoEnvironment:
 
 class UnoPlayer:
 
-    def __init__(self, game, num_cards=7):
+    __slots__ = ('game', 'state', 'hand_state', 'cards', 'card_count')
+
+    def __init__(self, game, num_cards=7, state=None):
         self.game = game
 
+        # the player's observation buffer, the hand section is kept in sync with the cards
+        if state is None:
+            state = np.zeros(self.game.STATE_SIZE, dtype=np.float32)
+        self.state = state
+        self.hand_state = self.state[self.game.STATE_CARDS]
+
+        # number of cards per card type and the cached total number of cards
+        self.cards = np.zeros(len(self.game.CARDS), dtype=np.int16)
+        self.card_count = 0
+
         # randomly initialize the player's hand
-        self.cards = np.zeros(len(self.game.CARD_TYPES), dtype=np.float)
         self.draw_cards(num_cards)
 
     def draw_cards(self, count):
-        # draw cards randomly
-        for _ in range(count):
-            self.cards[np.random.randint(len(self.game.CARD_TYPES))] += 1
+        if self.game.deck is None:
+            # draw cards randomly from the pre-generated block
+            cards = self.game.random_cards.take(count)
+        else:
+            # draw cards from the top of the deck (fewer if all cards are in the players' hands)
+            cards = self.game.draw(count)
+            count = len(cards)
+
+        if count == 1:
+            self.cards[cards[0]] += 1
+            self.hand_state[cards[0]] = self.cards[cards[0]]
+        else:
+            self.cards += np.bincount(cards, minlength=len(self.cards)).astype(np.int16)
+            self.hand_state[:] = self.cards
+        self.card_count += count
 
     def play_card(self, card_index, colour=None):
         # check if this move is legal
@@ -223,15 +357,76 @@ class UnoPlayer:
 
         # play the selected card
         self.cards[card_index] -= 1
+        self.hand_state[card_index] = self.cards[card_index]
+        self.card_count -= 1
 
         # set the colour of the played card if the colour was provided (for wild and 4+ cards)
-        card = self.game.CARD_TYPES[card_index].copy()
+        card = self.game.CARDS[card_index]
         if colour is not None:
-            card[0] = colour
+            card = (colour, card[1])
         return card
 
     def num_cards(self):
-        return int(sum(self.cards))
+        return self.card_count
 
     def __repr__(self):
         return f'UnoPlayer({self.num_cards()})'
+
+
+class UnoDeck:
+
+    __slots__ = ('rng', 'cards', 'position', 'end', 'remaining', 'discarded')
+
+    # number of copies of every card in the 108 card deck (one 0 and two of every other card per colour,
+    # four wild and four 4+ cards)
+    CARD_COPIES = np.array([1 if type == 0 else 2 for _, type in UnoEnvironment.CARDS[:-2]] + [4, 4])
+    DECK = np.repeat(np.arange(len(CARD_COPIES)), CARD_COPIES).astype(np.int8)
+
+    def __init__(self, rng):
+        self.rng = rng
+        # preallocated draw pile, the cards at position:end are drawn next
+        self.cards = self.DECK.copy()
+        # histograms of the cards in the draw pile and in the discard pile
+        self.remaining = self.CARD_COPIES.copy()
+        self.discarded = np.zeros_like(self.CARD_COPIES)
+        self.reset()
+
+    def reset(self):
+        # shuffle the full deck once
+        self.cards[:] = self.DECK
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        self.end = len(self.cards)
+        self.remaining[:] = self.CARD_COPIES
+        self.discarded[:] = 0
+
+    def draw(self, count):
+        if self.end - self.position < count:
+            # draw pile ran out, shuffle the discard pile into it
+            self._recycle()
+            count = min(count, self.end - self.position)
+
+        # drawing is a pointer bump on the shuffled deck
+        cards = self.cards[self.position:self.position + count]
+        self.position += count
+        if count == 1:
+            self.remaining[cards[0]] -= 1
+        else:
+            self.remaining -= np.bincount(cards, minlength=len(self.remaining))
+        return cards
+
+    def discard(self, card_index):
+        self.discarded[card_index] += 1
+
+    def _recycle(self):
+        # move the remaining draw pile to the front and put the shuffled discard pile behind it
+        left = self.end - self.position
+        self.cards[:left] = self.cards[self.position:self.end].copy()
+        recycled = np.repeat(np.arange(len(self.discarded)), self.discarded).astype(np.int8)
+        self.rng.shuffle(recycled)
+        self.cards[left:left + len(recycled)] = recycled
+
+        self.position = 0
+        self.end = left + len(recycled)
+        self.remaining += self.discarded
+        self.discarded[:] = 0
@@ -0,0 +1,173 @@
+import os
+import sys
+import glob
+import json
+import itertools
+import multiprocessing
+import numpy as np
+from environment import UnoEnvironment
+from numpy_policy import NumpyPolicy
+from random_blocks import spawn_seeds
+
+MODEL_PATH = 'example_model.npz'
+# let models choose among legal actions only (for models trained with masked actions)
+MASKED_ACTIONS = False
+GAMES = 1000
+PROCESSES = os.cpu_count()
+GAMES_PER_TASK = 50
+MAX_GAME_LENGTH = 10000
+SEED = 0
+# z value of the 95% confidence intervals
+CONFIDENCE_Z = 1.96
+
+
+class NaivePolicy:
+    def act(self, env, rng):
+        # select the first legal move
+        return np.argmax(env.legal_action_mask())
+
+
+class RandomPolicy:
+    def act(self, env, rng):
+        # select a random legal move
+        return rng.choice(np.flatnonzero(env.legal_action_mask()))
+
+
+class ModelPolicy:
+    def __init__(self, path):
+        self.policy = NumpyPolicy.load(path)
+
+    def act(self, env, rng):
+        if MASKED_ACTIONS:
+            return self.policy.predict(env.get_state(), env.legal_action_mask())
+        # the model's action is played even if it is illegal, like the AI player during training
+        return self.policy.predict(env.get_state())
+
+
+def make_policy(spec):
+    if spec.lower() == 'naive':
+        return NaivePolicy()
+    elif spec.lower() == 'random':
+        return RandomPolicy()
+    elif spec.lower() == 'ai':
+        return ModelPolicy(MODEL_PATH)
+    return ModelPolicy(spec)
+
+
+# policies of the current worker process, loaded once by the pool initializer
+_policies = None
+
+def _init_worker(specs):
+    global _policies
+    _policies = [make_policy(spec) for spec in specs]
+
+
+def play_games(first_game, num_games, seed):
+    player_count = len(_policies)
+    # random streams of the environment and the policies, independent of the worker playing the task
+    env_seed, policy_seed = seed.spawn(2)
+    env = UnoEnvironment(player_count, seed=env_seed)
+    rng = np.random.default_rng(policy_seed)
+
+    # per game: index of the winning player (-1 if the game was cut off) and game length,
+    # per player: number of illegal moves
+    winners = np.full(num_games, -1)
+    lengths = np.zeros(num_games, dtype=np.int64)
+    illegal = np.zeros(player_count, dtype=np.int64)
+
+    for game in range(num_games):
+        env.reset()
+        # rotate the seating order every game to cancel out the advantage of the first seat
+        seats = list(np.roll(np.arange(player_count), first_game + game))
+        done = False
+        while not done and lengths[game] < MAX_GAME_LENGTH:
+            player = seats[env.turn]
+            _, _, done, info = env.step(_policies[player].act(env, rng))
+            lengths[game] += 1
+
+            if info['player'] == -1:
+                illegal[player] += 1
+            if info['player'] == 2 and winners[game] == -1:
+                # the first player without cards wins
+                winners[game] = player
+            if info['player'] in (-1, 2):
+                del seats[info['turn']]
+
+        if done and winners[game] == -1:
+            # everyone else was eliminated
+            winners[game] = seats[0]
+    return winners, lengths, illegal
+
+
+def run_tournament(specs, games=GAMES, processes=PROCESSES, seed=SEED):
+    # split the games into tasks with independent random streams
+    starts = list(range(0, games, GAMES_PER_TASK))
+    task_seeds = spawn_seeds(seed, len(starts))
+    tasks = [(start, min(GAMES_PER_TASK, games - start), task_seed) for start, task_seed in zip(starts, task_seeds)]
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(specs,)) as pool:
+        results = pool.starmap(play_games, tasks)
+    winners = np.concatenate([result[0] for result in results])
+    lengths = np.concatenate([result[1] for result in results])
+    illegal = np.sum([result[2] for result in results], axis=0)
+    return summarize(specs, winners, lengths, illegal)
+
+
+def summarize(specs, winners, lengths, illegal):
+    games = len(winners)
+    players = []
+    for i, spec in enumerate(specs):
+        # win and illegal move rates (an illegal move eliminates the player, so at most one per game)
+        # with normal approximation confidence intervals
+        win_rate = np.mean(winners == i)
+        illegal_rate = illegal[i] / games
+        players.append({'player': spec,
+                        'win_rate': win_rate,
+                        'win_rate_ci': CONFIDENCE_Z * np.sqrt(win_rate * (1 - win_rate) / games),
+                        'illegal_move_rate': illegal_rate,
+                        'illegal_move_rate_ci': CONFIDENCE_Z * np.sqrt(illegal_rate * (1 - illegal_rate) / games)})
+    return {'games': games,
+            'cut_off_games': int(np.sum(winners == -1)),
+            'game_length': np.mean(lengths),
+            'game_length_ci': CONFIDENCE_Z * np.std(lengths) / np.sqrt(games),
+            'players': players}
+
+
+def print_summary(summary):
+    print(f'{summary["games"]} games, mean length {summary["game_length"]:.1f} ± {summary["game_length_ci"]:.1f} '
+          f'({summary["cut_off_games"]} cut off after {MAX_GAME_LENGTH} moves)')
+    for player in summary['players']:
+        print(f'{player["player"]:>40}: win rate {player["win_rate"]:.3f} ± {player["win_rate_ci"]:.3f}, '
+              f'illegal moves per game {player["illegal_move_rate"]:.3f} ± {player["illegal_move_rate_ci"]:.3f}')
+
+
+def expand_checkpoints(specs):
+    # a models/<timestamp> folder evaluates each of its checkpoints in place of the folder,
+    # several folders evaluate all combinations of their checkpoints
+    choices = [sorted(glob.glob(f'{spec}/*.npz'), key=os.path.getmtime) if os.path.isdir(spec) else [spec] for spec in specs]
+    return [list(combination) for combination in itertools.product(*choices)]
+
+
+if __name__ == '__main__':
+    # usage: python evaluate.py <player1> <player2> ... [--games N] [--processes N] [--output path.json]
+    args = sys.argv[1:]
+    options = {'--games': GAMES, '--processes': PROCESSES, '--output': None}
+    for option in options:
+        if option in args:
+            index = args.index(option)
+            options[option] = args[index + 1]
+            del args[index:index + 2]
+
+    if len(args) < 2:
+        print('Specify at least two players (AI, Naive, Random, a .npz model or a models/<timestamp> folder).')
+        exit()
+
+    summaries = []
+    for specs in expand_checkpoints(args):
+        summary = run_tournament(specs, int(options['--games']), int(options['--processes']))
+        print_summary(summary)
+        summaries.append(summary)
+
+    if options['--output'] is not None:
+        with open(options['--output'], 'w') as file:
+            json.dump(summaries, file, indent=2, default=float)
@@ -0,0 +1,129 @@
+import os
+import json
+import threading
+import numpy as np
+
+# storage types of the transition fields, all state values are small non-negative integers
+FIELDS = {'states': np.uint8, 'actions': np.uint8, 'rewards': np.float32, 'next_states': np.uint8, 'dones': bool}
+SHARD_SIZE = 100000
+
+
+class ExperienceWriter:
+
+    def __init__(self, path, state_size, n_steps, discount, shard_size=SHARD_SIZE):
+        self.path = path
+        self.shard_size = shard_size
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        # the rewards are n-step returns, which are only valid with the same n and discount
+        settings = {'state_size': state_size, 'n_steps': n_steps, 'discount': discount}
+
+        # continue an existing dataset with a new shard
+        if os.path.exists(f'{path}/index.json'):
+            with open(f'{path}/index.json') as file:
+                self.index = json.load(file)
+            for name, value in settings.items():
+                if self.index.get(name) != value:
+                    raise ValueError(f'Dataset at "{path}" has {name} {self.index.get(name)}, not {value}')
+        else:
+            self.index = {**settings, 'shards': []}
+
+        # preallocated buffer of the current shard
+        self.buffers = {name: np.zeros((shard_size, state_size) if name.endswith('states') else shard_size, dtype=dtype)
+                        for name, dtype in FIELDS.items()}
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def append(self, state, action, reward, next_state, done):
+        self.extend([state], [action], [reward], [next_state], [done])
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        fields = {'states': states, 'actions': actions, 'rewards': rewards, 'next_states': next_states, 'dones': dones}
+        total = len(actions)
+        with self.lock:
+            written = 0
+            while written < total:
+                # copy as much as fits into the current shard
+                count = min(total - written, self.shard_size - self.count)
+                for name, values in fields.items():
+                    values = values[written:written + count]
+                    if FIELDS[name] == np.uint8:
+                        values = np.clip(values, 0, 255)
+                    self.buffers[name][self.count:self.count + count] = values
+                self.count += count
+                written += count
+
+                if self.count == self.shard_size:
+                    self._write_shard()
+
+    def flush(self):
+        with self.lock:
+            if self.count > 0:
+                self._write_shard()
+
+    def _write_shard(self):
+        # write every field of the shard to its own fixed-width .npy file
+        name = f'shard-{len(self.index["shards"]):05d}'
+        for field, buffer in self.buffers.items():
+            np.save(f'{self.path}/{name}.{field}.npy', buffer[:self.count])
+        self.index['shards'].append({'name': name, 'size': self.count})
+        self.count = 0
+
+        # replace the index atomically, readers never see a shard before it is complete
+        with open(f'{self.path}/index.json.tmp', 'w') as file:
+            json.dump(self.index, file, indent=2)
+        os.replace(f'{self.path}/index.json.tmp', f'{self.path}/index.json')
+
+
+class ExperienceDataset:
+
+    def __init__(self, path):
+        with open(f'{path}/index.json') as file:
+            self.index = json.load(file)
+        self.state_size = self.index['state_size']
+        # n-step return settings the rewards were accumulated with (None for datasets without them)
+        self.n_steps = self.index.get('n_steps')
+        self.discount = self.index.get('discount')
+
+        # memory map all shards, data is only read from disk when it is accessed
+        self.shards = [{field: np.load(f'{path}/{shard["name"]}.{field}.npy', mmap_mode='r') for field in FIELDS}
+                       for shard in self.index['shards']]
+        # index of the first transition of every shard
+        self.offsets = np.cumsum([0] + [shard['size'] for shard in self.index['shards']])
+
+    def get(self, indices):
+        indices = np.asarray(indices)
+        states = np.zeros((len(indices), self.state_size), dtype=np.float32)
+        actions = np.zeros(len(indices), dtype=np.int64)
+        rewards = np.zeros(len(indices), dtype=np.float32)
+        next_states = np.zeros((len(indices), self.state_size), dtype=np.float32)
+        dones = np.zeros(len(indices), dtype=bool)
+
+        # gather the transitions shard by shard
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        for shard_id in np.unique(shard_ids):
+            selected = shard_ids == shard_id
+            local = indices[selected] - self.offsets[shard_id]
+            shard = self.shards[shard_id]
+            states[selected] = shard['states'][local]
+            actions[selected] = shard['actions'][local]
+            rewards[selected] = shard['rewards'][local]
+            next_states[selected] = shard['next_states'][local]
+            dones[selected] = shard['dones'][local]
+        return states, actions, rewards, next_states, dones
+
+    def sample(self, batch_size, rng):
+        # sorted indices keep the reads from each memory mapped shard sequential
+        return self.get(np.sort(rng.integers(len(self), size=batch_size)))
+
+    def fill(self, replay_memory, chunk_size=SHARD_SIZE):
+        # warm start a replay memory with the most recent transitions that fit into it
+        start = max(len(self) - replay_memory.capacity, 0)
+        for chunk_start in range(start, len(self), chunk_size):
+            transitions = self.get(np.arange(chunk_start, min(chunk_start + chunk_size, len(self))))
+            replay_memory.extend(*transitions)
+        return len(self) - start
+
+    def __len__(self):
+        return int(self.offsets[-1])
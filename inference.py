@@ -0,0 +1,84 @@
+import time
+import queue
+import threading
+import numpy as np
+from profiler import profiler
+
+
+class InferenceRequest:
+
+    __slots__ = ('state', 'legal_mask', 'action', 'error', 'event')
+
+    def __init__(self, state, legal_mask):
+        self.state = state
+        self.legal_mask = legal_mask
+        self.action = None
+        self.error = None
+        self.event = threading.Event()
+
+
+class InferenceServer:
+
+    def __init__(self, predict_function, max_batch_size=64, max_wait=0.001):
+        # predict_function maps a batch of states to a batch of Q values
+        self.predict_function = predict_function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.requests = queue.Queue()
+        # threads which have called predict, a batch is complete once all of them are waiting
+        self.callers = set()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def predict(self, state, legal_mask=None):
+        # queue the state and block until the server has processed the micro-batch
+        self.callers.add(threading.get_ident())
+        request = InferenceRequest(state, legal_mask)
+        self.requests.put(request)
+        request.event.wait()
+        if request.error is not None:
+            # the forward pass failed in the server thread
+            raise request.error
+        return request.action
+
+    def _collect_batch(self):
+        # wait for the first request, then gather more until the batch is full, all callers are waiting
+        # or the deadline is reached
+        batch = [self.requests.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < min(self.max_batch_size, len(self.callers)):
+            remaining = deadline - time.time()
+            try:
+                if remaining > 0:
+                    batch.append(self.requests.get(timeout=remaining))
+                else:
+                    batch.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._collect_batch()
+            profiler.gauge('inference_batch_size', len(batch))
+            profiler.gauge('inference_queue_backlog', self.requests.qsize())
+
+            try:
+                # run a single forward pass for all pending states
+                q_values = np.array(self.predict_function(np.stack([request.state for request in batch])))
+            except Exception as error:
+                # hand the error to the waiting collectors instead of leaving them blocked
+                for request in batch:
+                    request.error = error
+                    request.event.set()
+                continue
+            for i, request in enumerate(batch):
+                if request.legal_mask is not None:
+                    # only consider legal actions
+                    q_values[i, ~request.legal_mask] = -np.inf
+
+            # scatter the selected actions back to the waiting collectors
+            actions = np.argmax(q_values, axis=1)
+            for request, action in zip(batch, actions):
+                request.action = action
+                request.event.set()
@@ -0,0 +1,62 @@
+import os
+import glob
+import numpy as np
+from numpy_policy import NumpyPolicy
+
+
+class OpponentPool:
+
+    def __init__(self, pattern, size, state_size, action_count, include_naive=True):
+        # frozen checkpoints matching the glob pattern, the newest compatible ones form the pool
+        self.pattern = pattern
+        self.size = size
+        # checkpoints have to fit the observations and actions of the environment (e.g. other deck settings do not)
+        self.state_size = state_size
+        self.action_count = action_count
+        self.include_naive = include_naive
+
+        # loaded policies by path, every checkpoint is loaded only once per worker
+        self.loaded = {}
+        # incompatible checkpoints, which are never loaded again
+        self.skipped = set()
+        self.refresh()
+
+    def refresh(self):
+        members = {}
+        for path in sorted(glob.glob(self.pattern), key=os.path.getmtime, reverse=True):
+            if len(members) >= self.size:
+                break
+            if path in self.skipped:
+                continue
+
+            policy = self.loaded[path] if path in self.loaded else NumpyPolicy.load(path)
+            inputs, outputs = policy.layers[0][0].shape[0], policy.layers[-1][0].shape[1]
+            if (inputs, outputs) != (self.state_size, self.action_count):
+                print(f'Skipping opponent checkpoint {path} with {inputs} inputs and {outputs} outputs '
+                      f'(expected {self.state_size} and {self.action_count})')
+                self.skipped.add(path)
+                continue
+            members[path] = policy
+
+        # forget the checkpoints which left the pool, members are ordered from the oldest to the newest
+        self.loaded = dict(reversed(list(members.items())))
+        self.members = list(self.loaded.values())
+
+    def __len__(self):
+        # the naive heuristic is the last member
+        return len(self.members) + self.include_naive
+
+    def act(self, member, state, legal_mask):
+        if member == len(self.members):
+            # naive heuristic, select the first legal move
+            return np.argmax(legal_mask)
+        # frozen opponents only choose among legal moves
+        return self.members[member].predict(state, legal_mask)
+
+    def choose_opponents(self, rng, player_count, seats):
+        # pool member of every seat, -1 for the seats played by the learning policy
+        opponents = np.full(player_count, -1)
+        if len(self) > 0:
+            chosen = rng.choice(player_count, min(seats, player_count - 1), replace=False)
+            opponents[chosen] = rng.integers(len(self), size=len(chosen))
+        return opponents
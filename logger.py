@@ -0,0 +1,101 @@
+import os
+import csv
+import json
+import time
+import threading
+from datetime import datetime
+
+
+class CSVSink:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['time', 'name', 'step', 'mean', 'min', 'max', 'count'])
+
+    def write(self, name, step, stats):
+        self.writer.writerow([time.time(), name, step, stats['mean'], stats['min'], stats['max'], stats['count']])
+
+    def flush(self):
+        self.file.flush()
+
+
+class JSONLSink:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def write(self, name, step, stats):
+        self.file.write(json.dumps({'time': time.time(), 'name': name, 'step': step, **stats}) + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+
+class MetricsLogger:
+    def __init__(self, log_dir, sinks=('tensorboard',), interval=10):
+        # initialize the logger
+        self.timestamp = datetime.now().strftime('%y-%m-%d_%H-%M-%S')
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        self.sinks = []
+        for sink in sinks:
+            if sink == 'tensorboard':
+                # only import tensorflow if the tensorboard sink is used
+                from tensorboard import TensorflowLogger
+                self.sinks.append(TensorflowLogger(log_dir, self.timestamp))
+            elif sink == 'csv':
+                self.sinks.append(CSVSink(f'{log_dir}/metrics_{self.timestamp}.csv'))
+            elif sink == 'jsonl':
+                self.sinks.append(JSONLSink(f'{log_dir}/metrics_{self.timestamp}.jsonl'))
+            else:
+                raise ValueError(f'Unknown log sink "{sink}"')
+
+        # scalars logged since the last write and the current step of every scalar
+        self.buffer = {}
+        self.variable_steps = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+        self.log_dir = log_dir
+        # aggregate and write the buffered scalars periodically in the background
+        self.interval = interval
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def scalar(self, name, value, step=None):
+        with self.lock:
+            # get the step value for the current scalar
+            if step is None:
+                step = self.variable_steps[name] = self.variable_steps.get(name, -1) + 1
+            else:
+                self.variable_steps[name] = step
+
+            # buffer the value until the next write
+            if name in self.buffer:
+                self.buffer[name][1].append(value)
+            else:
+                self.buffer[name] = [step, [value]]
+            self.buffer[name][0] = step
+
+    def write_info(self, info):
+        # store information about the run (e.g. its seed) next to the metrics
+        with open(f'{self.log_dir}/run_{self.timestamp}.json', 'w') as file:
+            json.dump(info, file, indent=2)
+
+    def flush(self):
+        # swap out the buffer so logging threads are not blocked while writing
+        with self.lock:
+            buffer, self.buffer = self.buffer, {}
+
+        with self.write_lock:
+            for name, (step, values) in buffer.items():
+                # aggregate all values logged since the last write
+                stats = {'mean': float(sum(values)) / len(values), 'min': float(min(values)), 'max': float(max(values)), 'count': len(values)}
+                for sink in self.sinks:
+                    sink.write(name, step, stats)
+            for sink in self.sinks:
+                sink.flush()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
@@ -0,0 +1,68 @@
+import os
+import sys
+import numpy as np
+
+
+def export_model(model, path):
+    # check that the model is a stack of dense layers with ReLU hidden layers and a linear output layer
+    activations = [layer.get_config().get('activation') for layer in model.layers]
+    if activations[:-1] != ['relu'] * (len(activations) - 1) or activations[-1] != 'linear':
+        raise ValueError(f'Unsupported model architecture with activations {activations}')
+
+    # store kernels and biases of all layers in a compact weight file
+    weights = model.get_weights()
+    arrays = {}
+    for i, (kernel, bias) in enumerate(zip(weights[::2], weights[1::2])):
+        arrays[f'kernel_{i}'] = kernel.astype(np.float32)
+        arrays[f'bias_{i}'] = bias.astype(np.float32)
+
+    # replace the file atomically, opponent pools may load checkpoints while they are written
+    with open(f'{path}.tmp', 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(f'{path}.tmp', path)
+
+
+class NumpyPolicy:
+
+    def __init__(self, weights):
+        # weights as returned by model.get_weights() for a stack of dense layers (kernel, bias, kernel, bias, ...)
+        self.layers = [(np.asarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32))
+                       for kernel, bias in zip(weights[::2], weights[1::2])]
+
+    @classmethod
+    def load(cls, path):
+        # load a weight file written by export_model
+        with np.load(path) as arrays:
+            weights = []
+            for i in range(len(arrays.files) // 2):
+                weights += [arrays[f'kernel_{i}'], arrays[f'bias_{i}']]
+        return cls(weights)
+
+    def q_values(self, states):
+        # forward pass through the ReLU hidden layers and the linear output layer
+        x = np.asarray(states, dtype=np.float32)
+        for kernel, bias in self.layers[:-1]:
+            x = np.maximum(x @ kernel + bias, 0)
+        kernel, bias = self.layers[-1]
+        return x @ kernel + bias
+
+    def predict(self, state, legal_mask=None):
+        q_values = self.q_values(state.reshape(1, -1))[0]
+        if legal_mask is not None:
+            # only consider legal actions
+            q_values = np.where(legal_mask, q_values, -np.inf)
+        # return the index of the action with the highest predicted Q value
+        return np.argmax(q_values)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python numpy_policy.py path/to/model.h5 [path/to/model.npz]')
+        exit()
+    model_path = sys.argv[1]
+    export_path = sys.argv[2] if len(sys.argv) > 2 else model_path.rsplit('.', 1)[0] + '.npz'
+
+    # convert a trained Keras model to a NumPy weight file
+    from keras.models import load_model
+    export_model(load_model(model_path), export_path)
+    print(f'Exported {model_path} to {export_path}')
@@ -3,11 +3,17 @@ import time
 import pygame
 import numpy as np
 from environment import UnoEnvironment
+from numpy_policy import NumpyPolicy
 from renderer import *
 
-MODEL_PATH = 'example_model.h5'
+MODEL_PATH = 'example_model.npz'
+# let the AI choose among legal actions only (for models trained with masked actions)
+MASKED_ACTIONS = False
 
 MOVE_TIME = 0
+# play bot moves as fast as possible and only render FPS times per second
+SIMULATION_MODE = False
+FPS = 30
 SHOW_NON_HUMAN_CARDS = False
 
 FONT = 'arial'
@@ -20,6 +26,10 @@ BACKGROUND = (180, 180, 180)
 POSSIBLE_PLAYER_TYPES = ['AI', 'Human', 'Naive']
 
 # check command line arguments
+if '--simulate' in sys.argv:
+    SIMULATION_MODE = True
+    sys.argv.remove('--simulate')
+
 if len(sys.argv) < 3:
     print(f'Not enough players specified ({len(sys.argv) - 1}).', end='')
     player_options_str = ', '.join(POSSIBLE_PLAYER_TYPES)
@@ -58,8 +68,12 @@ font_small = pygame.font.SysFont(FONT, FONT_SIZE_SMALL)
 if 0 in player_types:
     if MODEL_PATH is not None:
         print('Loading model...')
-        from keras.models import load_model
-        model = load_model(MODEL_PATH)
+        if MODEL_PATH.endswith('.npz'):
+            # exported NumPy weights, no tensorflow required
+            policy = NumpyPolicy.load(MODEL_PATH)
+        else:
+            from keras.models import load_model
+            policy = NumpyPolicy(load_model(MODEL_PATH).get_weights())
     else:
         print('Please specify a model path.')
         exit()
@@ -67,15 +81,70 @@ if 0 in player_types:
 # initialize game variables
 game_messages = []
 last_move = time.time()
+last_render = 0
 
 print('Initializing game environment...')
 env = UnoEnvironment(len(player_types))
 
+
+def select_action(clicked, card_rects):
+    if player_types[env.turn] == 1:
+        # human player
+        if clicked:
+            # check if one of the player's cards was selected
+            mouse_pos = pygame.mouse.get_pos()
+            index = np.argwhere([rect.contains(mouse_pos + (0, 0)) for rect in card_rects])
+            if len(index) > 0:
+                if index[0,0] == np.sum(env.players[env.turn].cards):
+                    # draw from stack selected
+                    action = len(UnoEnvironment.CARD_TYPES)
+                else:
+                    # one of the player's cards was clicked
+                    cards = [[index] * int(count) for index, count in enumerate(env.players[env.turn].cards) if count > 0]
+                    cards = np.concatenate(cards)
+                    # get the selected card index
+                    action = cards[index[0,0]]
+
+                if env.legal_move(action):
+                    # only play the selected action if it is legal
+                    return action
+                game_messages.append((time.time(), 'Illegal move!'))
+        # no card was selected
+        return None
+
+    if not SIMULATION_MODE and time.time() - last_move < MOVE_TIME:
+        # wait until move delay is reached
+        return None
+
+    if player_types[env.turn] == 0:
+        # AI player
+        state = env.get_state()
+        legal_mask = env.legal_action_mask()
+        action = policy.predict(state, legal_mask if MASKED_ACTIONS else None)
+
+        # make random move if the AI selected an illegal move
+        if not legal_mask[action]:
+            game_messages.append((time.time(), f'{player_names[env.turn]} selected an illegal action, play random card.'))
+            action = np.random.choice(np.flatnonzero(legal_mask))
+        return action
+    elif player_types[env.turn] == 2:
+        # naive player, select the first legal move
+        return np.argmax(env.legal_action_mask())
+
+
+def simulating():
+    # in simulation mode bot turns are played without waiting for the next frame
+    return SIMULATION_MODE and not game_finished and player_types[env.turn] != 1
+
+
 # init flags
 mouse_down = False
 clicked = False
 done = False
 game_finished = False
+# the screen is only redrawn when the game state, the messages or the mouse over highlighting changed
+dirty = True
+card_rects = []
 
 print('Done! Running game loop...')
 while not done:
@@ -91,95 +160,57 @@ while not done:
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
                 mouse_down = False
+        elif event.type == pygame.MOUSEMOTION:
+            # human players' cards are highlighted during mouse over
+            dirty = dirty or 1 in player_types
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.ACTIVEEVENT):
+            dirty = True
 
-    if not game_finished:
-        # reset screen
+    # remove game messages older than GAME_MESSAGE_DURATION
+    message_count = len(game_messages)
+    game_messages = [msg for msg in game_messages if time.time() - msg[0] < GAME_MESSAGE_DURATION]
+    dirty = dirty or len(game_messages) != message_count
+
+    # render at most FPS times per second while bots are simulated
+    if dirty and (not simulating() or time.time() - last_render >= 1 / FPS):
         screen.fill(BACKGROUND)
-        # render objects
-        card_rects = draw_env(env, screen, font_large, player_names, player_types, draw_non_human=SHOW_NON_HUMAN_CARDS)
+        # show all cards once the game has finished
+        card_rects = draw_env(env, screen, font_large, player_names, player_types, draw_non_human=SHOW_NON_HUMAN_CARDS or game_finished)
         draw_messages(game_messages, screen, font_small)
         pygame.display.flip()
+        last_render = time.time()
+        dirty = False
 
+    frame_start = time.time()
+    while not game_finished:
         # game logic
-        if player_types[env.turn] == 0:
-            if time.time() - last_move < MOVE_TIME:
-                # wait until move delay is reached
-                action = None
-            else:
-                # AI player
-                state = env.get_state()
-                action = np.argmax(model.predict(state.reshape((1, -1)))[0])
-
-                # make random move if the AI selected an illegal move
-                if not env.legal_move(action):
-                    game_messages.append((time.time(), f'{player_names[env.turn]} selected an illegal action, play random card.'))
-                    while not env.legal_move(action):
-                        action = np.random.randint(env.action_count())
-        elif player_types[env.turn] == 1:
-            # human player
-            card_selected = False
-            if clicked:
-                # check if one of the player's cards was selected
-                mouse_pos = pygame.mouse.get_pos()
-                index = np.argwhere([rect.contains(mouse_pos + (0, 0)) for rect in card_rects])
-                if len(index) > 0:
-                    if index[0,0] == np.sum(env.players[env.turn].cards):
-                        # draw from stack selected
-                        action = len(UnoEnvironment.CARD_TYPES)
-                    else:
-                        # one of the player's cards was clicked
-                        cards = [[index] * int(count) for index, count in enumerate(env.players[env.turn].cards) if count > 0]
-                        cards = np.concatenate(cards)
-                        # get the selected card index
-                        action = cards[index[0,0]]
-
-                    if env.legal_move(action):
-                        # set selected to true if the selected action is legal
-                        card_selected = True
-                    else:
-                        game_messages.append((time.time(), 'Illegal move!'))
-            if not card_selected:
-                # no card was selected
-                action = None
-        elif player_types[env.turn] == 2:
-            if time.time() - last_move < MOVE_TIME:
-                # wait until move delay is reached
-                action = None
-            else:
-                # naive player
-                action = 0
-                # search for first legal move
-                while not env.legal_move(action):
-                    action += 1
-
-        if action is not None:
-            # play the selected action
-            _, _, game_finished, step_info = env.step(action)
-            last_move = time.time()
-
-            turn = step_info['turn']
-            player_status = step_info['player']
-
-            # check if the current player is out of the game
-            if player_status == -1 or player_status == 2:
-                if player_status == -1:
-                    game_messages.append((time.time(), f'{player_names[turn]} eliminated due to illegal move.'))
-                elif player_status == 2:
-                    game_messages.append((time.time(), f'{player_names[turn]} has finished!'))
-                del player_types[turn]
-                del player_names[turn]
-
-            # update game screen once after game has finished
-            if game_finished:
-                screen.fill(BACKGROUND)
-                draw_env(env, screen, font_large, player_names, player_types, draw_non_human=True)
-                draw_messages(game_messages, screen, font_small)
-                pygame.display.flip()
+        action = select_action(clicked, card_rects)
+        if action is None:
+            break
 
-    # remove game messages older than GAME_MESSAGE_DURATION
-    game_messages = [msg for msg in game_messages if time.time() - msg[0] < GAME_MESSAGE_DURATION]
+        # play the selected action
+        _, _, game_finished, step_info = env.step(action)
+        last_move = time.time()
+        dirty = True
+
+        turn = step_info['turn']
+        player_status = step_info['player']
+
+        # check if the current player is out of the game
+        if player_status == -1 or player_status == 2:
+            if player_status == -1:
+                game_messages.append((time.time(), f'{player_names[turn]} eliminated due to illegal move.'))
+            elif player_status == 2:
+                game_messages.append((time.time(), f'{player_names[turn]} has finished!'))
+            del player_types[turn]
+            del player_names[turn]
+
+        # outside of simulation mode every move is shown, otherwise bots play until the next frame is due
+        if not simulating() or time.time() - frame_start >= 1 / FPS:
+            break
 
-    # limit the frame rate
-    clock.tick(30)
+    if not simulating():
+        # limit the frame rate
+        clock.tick(FPS)
 
 pygame.quit()
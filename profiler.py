@@ -0,0 +1,108 @@
+import os
+import time
+import random
+import threading
+import contextlib
+import numpy as np
+
+
+class Timer:
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class Profiler:
+
+    # shared no-op context returned by timer() while profiling is disabled
+    NULL_TIMER = contextlib.nullcontext()
+    # durations kept per timer for the percentiles (uniform reservoir sample)
+    RESERVOIR_SIZE = 10000
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.random = random.Random()
+        self._reset()
+
+    def _reset(self):
+        self.durations = {}
+        self.counters = {}
+        self.gauges = {}
+        self.start_time = time.time()
+
+    def timer(self, name):
+        # measure the duration of a with-block
+        if not self.enabled:
+            return self.NULL_TIMER
+        return Timer(self, name)
+
+    def record(self, name, duration):
+        with self.lock:
+            # number of calls, total duration and the reservoir, memory stays bounded between summaries
+            if name not in self.durations:
+                self.durations[name] = [0, 0.0, []]
+            stats = self.durations[name]
+            stats[0] += 1
+            stats[1] += duration
+            if len(stats[2]) < self.RESERVOIR_SIZE:
+                stats[2].append(duration)
+            else:
+                index = self.random.randrange(stats[0])
+                if index < self.RESERVOIR_SIZE:
+                    stats[2][index] = duration
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def summary(self):
+        # collect all measurements since the last summary
+        with self.lock:
+            durations, counters, gauges = self.durations, self.counters, self.gauges
+            elapsed = max(time.time() - self.start_time, 1e-9)
+            self._reset()
+
+        metrics = {}
+        for name, (count, total, values) in durations.items():
+            # calls per second and latency percentiles in milliseconds
+            values = np.array(values) * 1000
+            metrics[f'{name}_per_second'] = count / elapsed
+            metrics[f'{name}_ms_mean'] = total / count * 1000
+            for percentile in (50, 90, 99):
+                metrics[f'{name}_ms_p{percentile}'] = np.percentile(values, percentile)
+        for name, value in counters.items():
+            metrics[f'{name}_per_second'] = value / elapsed
+        metrics.update(gauges)
+        return metrics
+
+    def start_reporting(self, logger, interval=30):
+        # publish summaries through the logger and the console in the background
+        threading.Thread(target=self._report, args=(logger, interval), daemon=True).start()
+
+    def _report(self, logger, interval):
+        while True:
+            time.sleep(interval)
+            metrics = self.summary()
+            print(f'--- profile ({interval}s) ---')
+            for name in sorted(metrics):
+                logger.scalar(f'profile/{name}', metrics[name])
+                print(f'{name:>40}: {metrics[name]:.4f}')
+
+
+# global profiler instance, enabled with the UNO_PROFILE environment variable or train.py --profile
+profiler = Profiler(os.environ.get('UNO_PROFILE', '0') not in ('', '0'))
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def spawn_seeds(seed, count):
+    # independent child seeds of a root SeedSequence, one per environment or collector
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+class BlockRandom:
+
+    __slots__ = ('rng', 'high', 'block_size', 'block', 'values', 'index')
+
+    def __init__(self, rng, high=None, block_size=4096):
+        # random integers in [0, high) or floats in [0, 1) if high is None, generated in blocks
+        self.rng = rng
+        self.high = high
+        self.block_size = block_size
+        self._refill()
+
+    def _refill(self):
+        if self.high is None:
+            self.block = self.rng.random(self.block_size)
+        else:
+            self.block = self.rng.integers(self.high, size=self.block_size)
+        # Python values for cheap scalar access
+        self.values = self.block.tolist()
+        self.index = 0
+
+    def next(self):
+        if self.index == self.block_size:
+            self._refill()
+        value = self.values[self.index]
+        self.index += 1
+        return value
+
+    def take(self, count):
+        if count > self.block_size:
+            # too many values for a single block
+            return self.rng.integers(self.high, size=count)
+        if self.index + count > self.block_size:
+            # discard the rest of the block, this keeps the stream deterministic
+            self._refill()
+        values = self.block[self.index:self.index + count]
+        self.index += count
+        return values
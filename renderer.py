@@ -15,6 +15,10 @@ CARD_HIGHLIGHT_BORDER = 3
 
 NAME_WIDTH = 150
 
+# pre-rendered cards keyed by (colour, type, highlighted, backside) and pre-rendered texts
+card_surfaces = {}
+text_surfaces = {}
+
 
 def draw_card(pos, card, surface, font, highlightable=False, backside=False):
     # get card colour and type
@@ -25,10 +29,8 @@ def draw_card(pos, card, surface, font, highlightable=False, backside=False):
     else:
         colour_index, card_type = UnoEnvironment.CARD_TYPES[card]
 
-    # get card colour tuple
-    colour = CARD_COLOURS[4]
-    if colour_index is not None:
-        colour = CARD_COLOURS[colour_index]
+    # get card colour tuple (uncoloured cards use the stack colour)
+    colour = CARD_COLOURS[colour_index]
 
     # get string for the card text
     if card_type == -1:
@@ -53,25 +55,40 @@ def draw_card(pos, card, surface, font, highlightable=False, backside=False):
         # 4+ card
         card_text = '4+'
 
-    # draw card rectangle
-    rect = pygame.rect.Rect((pos[0] - CARD_WIDTH // 2, pos[1] - CARD_HEIGHT // 2, CARD_WIDTH, CARD_HEIGHT))
     # decrease card size during mouse over
-    if highlightable and rect.contains(pygame.mouse.get_pos() + (0, 0)):
-        rect.x += CARD_HIGHLIGHT_BORDER
-        rect.y += CARD_HIGHLIGHT_BORDER
-        rect.width -= CARD_HIGHLIGHT_BORDER * 2
-        rect.height -= CARD_HIGHLIGHT_BORDER * 2
+    rect = pygame.rect.Rect((pos[0] - CARD_WIDTH // 2, pos[1] - CARD_HEIGHT // 2, CARD_WIDTH, CARD_HEIGHT))
+    highlighted = highlightable and rect.contains(pygame.mouse.get_pos() + (0, 0))
+
+    key = (colour_index, card_type, highlighted, backside)
+    if key not in card_surfaces:
+        card_surfaces[key] = render_card(colour, card_text, font, highlighted, backside)
+    surface.blit(card_surfaces[key], rect)
+
+def render_card(colour, card_text, font, highlighted, backside):
+    # pre-render a card onto a transparent surface of the full card size
+    card = pygame.Surface((CARD_WIDTH, CARD_HEIGHT), pygame.SRCALPHA)
+    rect = card.get_rect()
+    if highlighted:
+        rect.inflate_ip(-CARD_HIGHLIGHT_BORDER * 2, -CARD_HIGHLIGHT_BORDER * 2)
 
     if backside:
         colour = CARD_COLOURS[-1]
-    surface.fill(colour, rect)
+    card.fill(colour, rect)
 
     if not backside:
         # draw card text
         text = font.render(card_text, True, (0, 0, 0))
         text_rect = text.get_rect()
-        text_rect.center = pos
-        surface.blit(text, text_rect)
+        text_rect.center = card.get_rect().center
+        card.blit(text, text_rect)
+    return card
+
+def render_text(text, font):
+    # names and messages are rendered once and reused while they are shown
+    key = (font, text)
+    if key not in text_surfaces:
+        text_surfaces[key] = font.render(text, True, (0, 0, 0))
+    return text_surfaces[key]
 
 def draw_player(cards, has_turn, offset, surface, font, is_human, draw_non_human):
     if has_turn:
@@ -113,7 +130,7 @@ def draw_env(env, surface, font, names, types, draw_non_human=True):
         x_offset = 20 + CARD_WIDTH * 1.5
         y_offset = Y_MARGIN + i * (CARD_HEIGHT + Y_MARGIN) + CARD_HEIGHT / 2
 
-        text = font.render(name, True, (0, 0, 0))
+        text = render_text(name, font)
         text_rect = text.get_rect()
         text_rect.midleft = (x_offset, y_offset)
         surface.blit(text, text_rect)
@@ -132,7 +149,7 @@ def draw_messages(messages, surface, font):
     message_strings = [msg[1] for msg in messages]
     screen_rect = surface.get_bounding_rect()
     for i, msg in enumerate(message_strings):
-        text = font.render(msg, True, (0, 0, 0))
+        text = render_text(msg, font)
         text_rect = text.get_rect()
         x = screen_rect.width - X_MARGIN
         y = screen_rect.height - (i + 1) * (font.get_height())
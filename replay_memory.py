@@ -0,0 +1,189 @@
+import threading
+import numpy as np
+
+
+class ReplayMemory:
+
+    FIELDS = ('states', 'actions', 'rewards', 'next_states', 'dones')
+
+    def __init__(self, capacity, state_size, seed=None, mask_size=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+
+        # preallocated ring buffer of transitions
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        # optional legal action masks of the next states
+        self.fields = self.FIELDS
+        if mask_size is not None:
+            self.next_masks = np.ones((capacity, mask_size), dtype=bool)
+            self.fields += ('next_masks',)
+
+        # index of the next slot to write and number of stored transitions
+        self.position = 0
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def append(self, state, action, reward, next_state, done, next_mask=None):
+        with self.lock:
+            # overwrite the oldest transition once the memory is full
+            index = self.position
+            self.states[index] = state
+            self.actions[index] = action
+            self.rewards[index] = reward
+            self.next_states[index] = next_state
+            self.dones[index] = done
+            if len(self.fields) > len(self.FIELDS):
+                # transitions without a mask allow all actions
+                self.next_masks[index] = True if next_mask is None else next_mask
+
+            self.position = (index + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            self._added([index])
+        return index
+
+    def extend(self, states, actions, rewards, next_states, dones, next_masks=None):
+        count = len(actions)
+        with self.lock:
+            # write a whole batch of transitions, wrapping around the end of the buffer
+            indices = (self.position + np.arange(count)) % self.capacity
+            self.states[indices] = states
+            self.actions[indices] = actions
+            self.rewards[indices] = rewards
+            self.next_states[indices] = next_states
+            self.dones[indices] = dones
+            if len(self.fields) > len(self.FIELDS):
+                self.next_masks[indices] = True if next_masks is None else next_masks
+
+            self.position = (self.position + count) % self.capacity
+            self.size = min(self.size + count, self.capacity)
+            self._added(indices)
+        return indices
+
+    def sample(self, batch_size):
+        with self.lock:
+            # sample transitions uniformly
+            indices = self.rng.integers(self.size, size=batch_size)
+            return self._gather(indices)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(zip(self.fields, self._gather(self._order())))
+
+    def restore(self, arrays):
+        # keep the newest transitions if the snapshot does not fit into the memory
+        count = min(len(arrays['actions']), self.capacity)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.extend(*(arrays[name][len(arrays[name]) - count:] for name in self.fields if name in arrays))
+
+    def _order(self):
+        # indices of the stored transitions from the oldest to the newest
+        return (self.position - self.size + np.arange(self.size)) % self.capacity
+
+    def _gather(self, indices):
+        return tuple(getattr(self, name)[indices] for name in self.fields)
+
+    def _added(self, indices):
+        pass
+
+    def __len__(self):
+        return self.size
+
+
+class SumTree:
+
+    def __init__(self, capacity):
+        # binary tree stored as an array with the root at index 1 and the leaves at the end
+        self.leaf_offset = 1
+        while self.leaf_offset < capacity:
+            self.leaf_offset *= 2
+        self.tree = np.zeros(2 * self.leaf_offset)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.leaf_offset + indices]
+
+    def update(self, indices, priorities):
+        # set the leaves and recompute all parent sums level by level
+        nodes = self.leaf_offset + np.asarray(indices)
+        self.tree[nodes] = priorities
+        if len(nodes) == 1:
+            # walk up with scalars for single updates (appends), avoiding np.unique on every level
+            node = int(nodes[0]) // 2
+            while node > 0:
+                self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+                node //= 2
+            return
+        nodes = np.unique(nodes // 2)
+        while nodes[0] > 0:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        # descend from the root for all values at once
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.leaf_offset:
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = (values >= left_sum) & (self.tree[left + 1] > 0)
+            values -= np.where(go_right, left_sum, 0)
+            nodes = left + go_right
+        return nodes - self.leaf_offset
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, epsilon=1e-3, seed=None, mask_size=None):
+        super().__init__(capacity, state_size, seed, mask_size)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+
+        # priorities of all transitions, new transitions get the highest priority seen so far
+        self.priorities = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def _added(self, indices):
+        self.priorities.update(indices, self.max_priority)
+
+    def sample(self, batch_size):
+        with self.lock:
+            # stratified sampling proportional to the priorities
+            total = self.priorities.total()
+            values = (np.arange(batch_size) + self.rng.random(batch_size)) * total / batch_size
+            indices = np.minimum(self.priorities.find(values), self.size - 1)
+
+            # importance sampling weights, normalized by the largest weight in the batch
+            probabilities = self.priorities.get(indices) / total
+            weights = (self.size * probabilities) ** -self.beta
+            weights = (weights / weights.max()).astype(np.float32)
+            return self._gather(indices) + (indices, weights)
+
+    def snapshot(self):
+        arrays = super().snapshot()
+        with self.lock:
+            arrays['priorities'] = self.priorities.get(self._order())
+            arrays['max_priority'] = self.max_priority
+        return arrays
+
+    def restore(self, arrays):
+        indices = super().restore(arrays)
+        if 'priorities' in arrays and len(indices) > 0:
+            # snapshots of a uniform replay memory keep the maximum priority for all transitions
+            with self.lock:
+                self.priorities.update(indices, arrays['priorities'][len(arrays['priorities']) - len(indices):])
+                self.max_priority = float(arrays['max_priority'])
+        return indices
+
+    def update_priorities(self, indices, errors):
+        priorities = (np.abs(errors) + self.epsilon) ** self.alpha
+        with self.lock:
+            self.priorities.update(indices, priorities)
+            self.max_priority = max(self.max_priority, priorities.max())
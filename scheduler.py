@@ -0,0 +1,62 @@
+import time
+import threading
+
+
+class TrainingScheduler:
+
+    def __init__(self, min_transitions, replay_ratio=None, max_lag=None):
+        # number of transitions required before training, gradient steps per collected transition
+        # and the number of gradient steps the trainer may fall behind before collectors are paused
+        self.min_transitions = min_transitions
+        self.replay_ratio = replay_ratio
+        self.max_lag = max_lag
+
+        self.condition = threading.Condition()
+        self.transitions = 0
+        self.steps = 0
+
+        # counters at the last rate measurement
+        self.last_time = time.time()
+        self.last_transitions = 0
+        self.last_steps = 0
+
+    def add_transitions(self, count=1):
+        with self.condition:
+            if self.max_lag is not None:
+                # pause the collector while the trainer is too far behind
+                self.condition.wait_for(lambda: not self._trainer_behind())
+            self.transitions += count
+            self.condition.notify_all()
+
+    def wait_for_step(self):
+        # block until the trainer is allowed to do another gradient step
+        with self.condition:
+            self.condition.wait_for(self._can_train)
+
+    def step_done(self):
+        with self.condition:
+            self.steps += 1
+            self.condition.notify_all()
+
+    def rates(self):
+        # transitions and gradient steps per second since the last call
+        with self.condition:
+            now = time.time()
+            elapsed = max(now - self.last_time, 1e-9)
+            transition_rate = (self.transitions - self.last_transitions) / elapsed
+            step_rate = (self.steps - self.last_steps) / elapsed
+            self.last_time, self.last_transitions, self.last_steps = now, self.transitions, self.steps
+        return transition_rate, step_rate
+
+    def _allowed_steps(self):
+        return self.transitions * self.replay_ratio
+
+    def _can_train(self):
+        if self.transitions < self.min_transitions:
+            return False
+        return self.replay_ratio is None or self.steps < self._allowed_steps()
+
+    def _trainer_behind(self):
+        if self.replay_ratio is None or self.transitions < self.min_transitions:
+            return False
+        return self._allowed_steps() - self.steps > self.max_lag
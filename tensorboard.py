@@ -2,9 +2,9 @@ import tensorflow as tf
 from datetime import datetime
 
 class TensorflowLogger:
-    def __init__(self, log_dir):
+    def __init__(self, log_dir, timestamp=None):
         # initialize the logger
-        self.timestamp = datetime.now().strftime('%y-%m-%d_%H-%M-%S')
+        self.timestamp = timestamp or datetime.now().strftime('%y-%m-%d_%H-%M-%S')
         self.writer = tf.summary.FileWriter(log_dir + '/summary_' + self.timestamp)
         self.variable_steps = {}
 
@@ -22,6 +22,13 @@ class TensorflowLogger:
         summary = tf.Summary(value=[tf.Summary.Value(tag=name, simple_value=value)])
         self.writer.add_summary(summary, step)
 
+    def write(self, name, step, stats):
+        # write aggregated scalars from the MetricsLogger
+        self.scalar(name, stats['mean'], step)
+        if stats['count'] > 1:
+            self.scalar(name + '/min', stats['min'], step)
+            self.scalar(name + '/max', stats['max'], step)
+
     def flush(self):
         # flush the file writer
         self.writer.flush()
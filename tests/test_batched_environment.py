@@ -0,0 +1,77 @@
+import numpy as np
+from environment import UnoEnvironment
+from batched_environment import BatchedUnoEnvironment
+
+PLAYER_COUNT = 4
+GAMES = 150
+# share of random (mostly illegal) actions, which also covers cards without effect after illegal moves
+RANDOM_ACTION_PROBABILITY = 0.1
+
+
+def load_state(batched, env, seats):
+    # copy the scalar game state into the only environment of the batch, seats are the remaining players
+    batched.hands[0] = 0
+    batched.active[0] = False
+    for seat, player in zip(seats, env.players):
+        batched.hands[0, seat] = player.cards
+        batched.active[0, seat] = True
+    batched.top_colour[0], batched.top_type[0] = env.top_card
+    batched.to_draw[0] = env.to_draw
+    batched.turn[0] = seats[env.turn]
+    batched.turn_direction[0] = env.turn_direction
+
+
+def test_step_parity():
+    env = UnoEnvironment(PLAYER_COUNT, seed=0)
+    batched = BatchedUnoEnvironment(1, PLAYER_COUNT, seed=1)
+    rng = np.random.default_rng(2)
+    steps = 0
+
+    for _ in range(GAMES):
+        env.reset()
+        seats = list(range(PLAYER_COUNT))
+        done = False
+        while not done:
+            load_state(batched, env, seats)
+            np.testing.assert_array_equal(batched.get_state()[0], env.get_state())
+            legal_mask = env.legal_action_mask()
+            np.testing.assert_array_equal(batched.legal_action_mask()[0], legal_mask)
+
+            if rng.random() < RANDOM_ACTION_PROBABILITY:
+                action = rng.integers(env.action_count())
+            else:
+                action = rng.choice(np.flatnonzero(legal_mask))
+            seat = seats[env.turn]
+
+            _, reward, done, info = env.step(action)
+            _, rewards, dones, batched_info = batched.step([action])
+            steps += 1
+
+            assert rewards[0] == reward
+            assert dones[0] == done
+            assert batched_info['turn'][0] == info['turn']
+            assert batched_info['seat'][0] == seat
+            expected_status = BatchedUnoEnvironment.IGNORED_CARD if info['player'] is None else info['player']
+            assert batched_info['player'][0] == expected_status
+
+            if info['player'] in (-1, 2):
+                del seats[info['turn']]
+            if done:
+                # the batched environment was reset automatically
+                break
+
+            # drawn cards and wild colours are random, the rest of the game state has to match exactly
+            assert batched.top_type[0] == env.top_card[1]
+            if env.top_card[1] < 13:
+                assert batched.top_colour[0] == env.top_card[0]
+            assert batched.to_draw[0] == env.to_draw
+            assert batched.turn[0] == seats[env.turn]
+            assert batched.turn_direction[0] == env.turn_direction
+            np.testing.assert_array_equal(np.flatnonzero(batched.active[0]), seats)
+            for other_seat, player in zip(seats, env.players):
+                if other_seat == seat and info['player'] == 0:
+                    assert batched.hands[0, seat].sum() == player.num_cards()
+                else:
+                    np.testing.assert_array_equal(batched.hands[0, other_seat], player.cards)
+    assert steps > 2000
+
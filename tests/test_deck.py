@@ -0,0 +1,48 @@
+import numpy as np
+from environment import UnoEnvironment, UnoDeck
+
+PLAYER_COUNT = 4
+GAMES = 100
+
+
+def card_total(env):
+    # cards in the draw pile, the discard pile, the players' hands and on top of the stack
+    deck = env.deck
+    total = (deck.end - deck.position) + deck.discarded.sum() + sum(player.cards.sum() for player in env.players)
+    return total + (env.top_card_index is not None)
+
+
+def test_deck_composition():
+    assert len(UnoDeck.DECK) == 108
+    deck = UnoDeck(np.random.default_rng(0))
+    # a full shuffled deck
+    np.testing.assert_array_equal(np.sort(deck.cards), UnoDeck.DECK)
+    np.testing.assert_array_equal(np.bincount(deck.draw(108), minlength=len(UnoDeck.CARD_COPIES)), UnoDeck.CARD_COPIES)
+    assert deck.remaining.sum() == 0
+    # nothing left to draw without discarded cards
+    assert len(deck.draw(3)) == 0
+
+
+def test_card_total_across_recycling():
+    env = UnoEnvironment(PLAYER_COUNT, finite_deck=True, deck_features=True, seed=0)
+    rng = np.random.default_rng(1)
+    recycled = 0
+
+    for _ in range(GAMES):
+        env.reset()
+        done = False
+        while not done:
+            legal_actions = np.flatnonzero(env.legal_action_mask())
+            # mostly legal moves, sometimes an illegal one which discards the player's hand
+            action = rng.integers(env.action_count()) if rng.random() < 0.02 else rng.choice(legal_actions)
+            end = env.deck.end
+            _, _, done, _ = env.step(action)
+            recycled += env.deck.end != end
+
+            assert card_total(env) == 108
+            # the histogram of the draw pile matches its cards and is part of the observations
+            deck = env.deck
+            remaining = np.bincount(deck.cards[deck.position:deck.end], minlength=len(deck.remaining))
+            np.testing.assert_array_equal(deck.remaining, remaining)
+            np.testing.assert_array_equal(env.get_state()[UnoEnvironment.STATE_DECK], remaining)
+    assert recycled > 0
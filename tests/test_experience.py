@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from experience import ExperienceWriter, ExperienceDataset
+from replay_memory import ReplayMemory
+
+STATE_SIZE = 5
+SHARD_SIZE = 100
+
+
+def transitions(start, count):
+    # transitions numbered by their action (states hold small integers like the observations)
+    index = np.arange(start, start + count)
+    states = (index[:, None] + np.arange(STATE_SIZE)) % 50
+    return states, index % 55, index * 0.5, (states + 1) % 50, index % 3 == 0
+
+
+def write_dataset(path, count):
+    writer = ExperienceWriter(path, STATE_SIZE, 3, 0.7, shard_size=SHARD_SIZE)
+    # batches of uneven size cross the shard boundaries, the last shard stays partial until flushed
+    start = 0
+    for size in (1, 70, 130, 99):
+        size = min(size, count - start)
+        writer.extend(*transitions(start, size))
+        start += size
+    for transition in zip(*transitions(start, count - start)):
+        writer.append(*transition)
+    writer.flush()
+
+
+def test_round_trip_across_shards(tmp_path):
+    count = 345
+    write_dataset(tmp_path, count)
+    dataset = ExperienceDataset(tmp_path)
+    assert len(dataset) == count
+    assert [shard['size'] for shard in dataset.index['shards']] == [100, 100, 100, 45]
+    assert (dataset.n_steps, dataset.discount) == (3, 0.7)
+
+    states, actions, rewards, next_states, dones = dataset.get(np.arange(count))
+    expected = transitions(0, count)
+    for array, reference in zip((states, actions, rewards, next_states, dones), expected):
+        np.testing.assert_array_equal(array, reference)
+
+    # reads by global index, unsorted and across shards
+    indices = np.array([344, 0, 100, 99, 250, 199, 300])
+    for array, reference in zip(dataset.get(indices), expected):
+        np.testing.assert_array_equal(array, reference[indices])
+
+
+def test_continue_dataset(tmp_path):
+    write_dataset(tmp_path, 150)
+    writer = ExperienceWriter(tmp_path, STATE_SIZE, 3, 0.7, shard_size=SHARD_SIZE)
+    writer.extend(*transitions(150, 20))
+    writer.flush()
+    dataset = ExperienceDataset(tmp_path)
+    np.testing.assert_array_equal(dataset.get(np.arange(170))[1], np.arange(170) % 55)
+
+    # other n-step settings would make the stored returns inconsistent
+    with pytest.raises(ValueError):
+        ExperienceWriter(tmp_path, STATE_SIZE, 1, 0.7, shard_size=SHARD_SIZE)
+
+
+def test_fill_keeps_newest(tmp_path):
+    count = 345
+    write_dataset(tmp_path, count)
+    dataset = ExperienceDataset(tmp_path)
+    memory = ReplayMemory(120, STATE_SIZE)
+
+    assert dataset.fill(memory, chunk_size=50) == 120
+    snapshot = memory.snapshot()
+    np.testing.assert_array_equal(snapshot['actions'], np.arange(count - 120, count) % 55)
+    np.testing.assert_array_equal(snapshot['rewards'], np.arange(count - 120, count) * 0.5)
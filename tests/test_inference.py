@@ -0,0 +1,56 @@
+import time
+import threading
+import numpy as np
+import pytest
+from inference import InferenceServer
+
+
+def test_predict_with_legal_masks():
+    server = InferenceServer(lambda states: states.copy(), max_wait=0.01)
+    assert server.predict(np.array([0.0, 2.0, 1.0])) == 1
+    assert server.predict(np.array([0.0, 2.0, 1.0]), np.array([True, False, True])) == 2
+
+
+def test_single_caller_does_not_wait_for_deadline():
+    server = InferenceServer(lambda states: states.copy(), max_wait=1)
+    server.predict(np.zeros(3))
+    start = time.perf_counter()
+    for _ in range(5):
+        server.predict(np.zeros(3))
+    # every request is served once its only caller is waiting
+    assert time.perf_counter() - start < 1
+
+
+def test_batches_all_waiting_callers():
+    sizes = []
+    barrier = threading.Barrier(4)
+
+    def predict_function(states):
+        sizes.append(len(states))
+        return states.copy()
+
+    server = InferenceServer(predict_function, max_wait=1)
+
+    def collector():
+        server.predict(np.zeros(3))
+        barrier.wait()
+        server.predict(np.zeros(3))
+
+    threads = [threading.Thread(target=collector) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert sum(sizes) == 8
+
+
+def test_errors_reach_the_callers():
+    def predict_function(states):
+        raise ValueError('forward pass failed')
+
+    server = InferenceServer(predict_function)
+    for _ in range(2):
+        # the server keeps running after an error
+        with pytest.raises(ValueError):
+            server.predict(np.zeros(3))
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+from league import OpponentPool
+
+
+def write_checkpoint(path, sizes, mtime):
+    # dense layers with the given input, hidden and output sizes
+    arrays = {}
+    for i, (inputs, outputs) in enumerate(zip(sizes[:-1], sizes[1:])):
+        arrays[f'kernel_{i}'] = np.zeros((inputs, outputs), dtype=np.float32)
+        arrays[f'bias_{i}'] = np.zeros(outputs, dtype=np.float32)
+    np.savez(path, **arrays)
+    os.utime(path, (mtime, mtime))
+
+
+def test_pool_skips_incompatible_checkpoints(tmp_path, capsys):
+    write_checkpoint(tmp_path / 'model-1.npz', [115, 8, 55], 1)
+    write_checkpoint(tmp_path / 'model-2.npz', [115, 16, 55], 2)
+    # a checkpoint of a run with deck features
+    write_checkpoint(tmp_path / 'model-3.npz', [169, 8, 55], 3)
+    write_checkpoint(tmp_path / 'model-4.npz', [115, 8, 55], 4)
+
+    pool = OpponentPool(str(tmp_path / '*.npz'), 2, 115, 55)
+    assert list(pool.loaded) == [str(tmp_path / 'model-2.npz'), str(tmp_path / 'model-4.npz')]
+    assert 'model-3.npz' in capsys.readouterr().out
+    # the naive heuristic is the last member
+    assert len(pool) == 3
+
+    state = np.zeros(115, dtype=np.float32)
+    legal_mask = np.zeros(55, dtype=bool)
+    legal_mask[[7, 54]] = True
+    for member in range(len(pool)):
+        assert legal_mask[pool.act(member, state, legal_mask)]
+
+    # the skipped checkpoint is not loaded or reported again
+    pool.refresh()
+    assert capsys.readouterr().out == ''
+    assert len(pool) == 3
@@ -0,0 +1,73 @@
+import numpy as np
+from replay_memory import ReplayMemory, SumTree, PrioritizedReplayMemory
+
+STATE_SIZE = 3
+
+
+def transitions(start, count):
+    # transitions numbered by their action
+    actions = np.arange(start, start + count)
+    states = np.repeat(actions[:, None], STATE_SIZE, axis=1).astype(np.float32)
+    return states, actions, actions * 0.5, states + 1, actions % 7 == 0
+
+
+def test_ring_buffer_keeps_newest():
+    memory = ReplayMemory(10, STATE_SIZE, seed=0)
+    memory.extend(*transitions(0, 6))
+    for transition in zip(*transitions(6, 3)):
+        memory.append(*transition)
+    memory.extend(*transitions(9, 8))
+
+    assert len(memory) == 10
+    states, actions, rewards, next_states, dones = memory.snapshot().values()
+    np.testing.assert_array_equal(actions, np.arange(7, 17))
+    np.testing.assert_array_equal(states[:, 0], actions)
+    np.testing.assert_array_equal(rewards, actions * 0.5)
+    np.testing.assert_array_equal(next_states[:, 0], actions + 1)
+    np.testing.assert_array_equal(dones, actions % 7 == 0)
+
+    # uniform samples only contain stored transitions
+    sampled = memory.sample(100)[1]
+    assert set(sampled) <= set(range(7, 17))
+
+
+def test_sum_tree_matches_reference():
+    rng = np.random.default_rng(0)
+    capacity = 37
+    tree = SumTree(capacity)
+    priorities = np.zeros(capacity)
+    for _ in range(200):
+        # single and batched updates
+        indices = rng.choice(capacity, size=rng.integers(1, 6), replace=False)
+        values = rng.random(len(indices))
+        tree.update(indices, values)
+        priorities[indices] = values
+
+        assert np.isclose(tree.total(), priorities.sum())
+        np.testing.assert_array_equal(tree.get(np.arange(capacity)), priorities)
+        # prefix sum lookups select the same leaves as a cumulative sum search
+        queries = rng.random(50) * priorities.sum()
+        expected = np.searchsorted(np.cumsum(priorities), queries, side='right')
+        np.testing.assert_array_equal(tree.find(queries), expected)
+
+
+def test_prioritized_sampling():
+    capacity = 8
+    memory = PrioritizedReplayMemory(capacity, STATE_SIZE, alpha=1, beta=0.5, epsilon=0, seed=0)
+    memory.extend(*transitions(0, capacity))
+    priorities = np.arange(1, capacity + 1, dtype=np.float64)
+    memory.update_priorities(np.arange(capacity), priorities)
+
+    # samples are drawn proportionally to the priorities
+    counts = np.zeros(capacity)
+    for _ in range(500):
+        *_, indices, weights = memory.sample(64)
+        counts += np.bincount(indices, minlength=capacity)
+        # importance weights normalized by the largest weight in the batch
+        expected = (capacity * priorities[indices] / priorities.sum()) ** -0.5
+        np.testing.assert_allclose(weights, expected / expected.max(), rtol=1e-5)
+    np.testing.assert_allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.01)
+
+    # new transitions get the highest priority seen so far
+    memory.append(*(field[0] for field in transitions(100, 1)))
+    assert memory.priorities.get(np.array([0]))[0] == capacity
@@ -0,0 +1,76 @@
+import threading
+from scheduler import TrainingScheduler
+
+# seconds to wait for a thread which is expected to be blocked or to finish
+TIMEOUT = 0.2
+
+
+def start(function, *args):
+    thread = threading.Thread(target=function, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def step(scheduler):
+    scheduler.wait_for_step()
+    scheduler.step_done()
+
+
+def test_waits_for_min_transitions():
+    scheduler = TrainingScheduler(10, replay_ratio=None)
+    scheduler.add_transitions(9)
+    trainer = start(scheduler.wait_for_step)
+    trainer.join(TIMEOUT)
+    assert trainer.is_alive()
+
+    scheduler.add_transitions()
+    trainer.join(TIMEOUT)
+    assert not trainer.is_alive()
+
+
+def test_steps_capped_by_replay_ratio():
+    scheduler = TrainingScheduler(4, replay_ratio=0.5)
+    scheduler.add_transitions(8)
+    for _ in range(4):
+        step(scheduler)
+
+    # steps are capped at transitions * replay_ratio, the fifth step needs another transition
+    trainer = start(step, scheduler)
+    trainer.join(TIMEOUT)
+    assert trainer.is_alive()
+    scheduler.add_transitions()
+    trainer.join(TIMEOUT)
+    assert not trainer.is_alive()
+    assert scheduler.steps == 5
+
+
+def test_collectors_pause_while_trainer_behind():
+    scheduler = TrainingScheduler(4, replay_ratio=1, max_lag=2)
+    scheduler.add_transitions(6)
+    # 6 allowed steps, 0 done: the trainer is more than max_lag steps behind
+    collector = start(scheduler.add_transitions)
+    collector.join(TIMEOUT)
+    assert collector.is_alive()
+    assert scheduler.transitions == 6
+
+    for _ in range(3):
+        step(scheduler)
+    collector.join(TIMEOUT)
+    assert collector.is_alive()
+    # resumes once the trainer is at most max_lag steps behind
+    step(scheduler)
+    collector.join(TIMEOUT)
+    assert not collector.is_alive()
+    assert scheduler.transitions == 7
+
+
+def test_unthrottled_without_replay_ratio():
+    scheduler = TrainingScheduler(2, replay_ratio=None, max_lag=1)
+    scheduler.add_transitions(2)
+    # the trainer steps freely and collectors never pause
+    for _ in range(100):
+        step(scheduler)
+    collector = start(scheduler.add_transitions, 1000)
+    collector.join(TIMEOUT)
+    assert not collector.is_alive()
+    assert scheduler.steps == 100
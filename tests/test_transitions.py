@@ -0,0 +1,112 @@
+import collections
+import numpy as np
+from environment import UnoEnvironment
+from transitions import NStepAccumulator, SeatTransitions
+
+DISCOUNT = 0.7
+STATE_SIZE = 4
+PLAYER_COUNT = 4
+GAMES = 300
+
+
+def n_step_reference(transitions, n, discount):
+    # transitions of one episode as (state, action, reward, next_state, done)
+    length = len(transitions)
+    expected = []
+    for t, (state, action, _, _, _) in enumerate(transitions):
+        end = min(t + n, length)
+        n_step_return = sum(discount ** k * transitions[t + k][2] for k in range(end - t))
+        expected.append((state, action, n_step_return, transitions[end - 1][3], t + n >= length))
+    return expected
+
+
+def collect(emitted):
+    # copy the emitted transitions, their arrays are only valid during the call
+    return lambda state, action, reward, next_state, done, next_mask: emitted.append(
+        (np.array(state), int(action), float(reward), np.array(next_state), bool(done)))
+
+
+def test_n_step_returns():
+    rng = np.random.default_rng(0)
+    for n in (1, 2, 3, 5):
+        accumulator = NStepAccumulator(n, DISCOUNT, STATE_SIZE)
+        for _ in range(50):
+            length = rng.integers(1, 12)
+            states = rng.random((length + 1, STATE_SIZE)).astype(np.float32)
+            rewards = rng.integers(-2, 11, size=length).astype(np.float32)
+            transitions = [(states[t], t, rewards[t], states[t + 1], t == length - 1) for t in range(length)]
+
+            emitted = []
+            accumulator.reset()
+            for transition in transitions:
+                accumulator.add(*transition, None, collect(emitted))
+
+            expected = n_step_reference(transitions, n, DISCOUNT)
+            assert len(emitted) == len(expected)
+            for (state, action, n_step_return, next_state, done), reference in zip(emitted, expected):
+                np.testing.assert_array_equal(state, reference[0])
+                assert action == reference[1]
+                assert np.isclose(n_step_return, reference[2])
+                np.testing.assert_array_equal(next_state, reference[3])
+                assert done == reference[4]
+
+
+def play_game(env, rng, seat_transitions, emit):
+    # play a game with mostly legal random moves, returns the transitions of every seat as seen by that seat
+    env.reset()
+    seats = list(range(PLAYER_COUNT))
+    history = [[] for _ in range(PLAYER_COUNT)]
+    state = env.get_state()
+    done = False
+    while not done and seat_transitions.recording():
+        if rng.random() < 0.03:
+            action = rng.integers(env.action_count())
+        else:
+            action = rng.choice(np.flatnonzero(env.legal_action_mask()))
+        seat = seats[env.turn]
+        next_state, reward, done, info = env.step(action)
+        seat_transitions.step(state, action, reward, next_state, done, None, info, env.turn, emit)
+
+        if history[seat] and not history[seat][-1][4]:
+            # the seat's previous transition ends in its current observation
+            history[seat][-1][3] = state
+        finished = info['player'] in (-1, 2)
+        history[seat].append([state, action, reward, None, finished])
+        if finished:
+            del seats[info['turn']]
+        state = next_state
+
+    # the episode ends for the remaining seats
+    for seat in range(PLAYER_COUNT):
+        if history[seat]:
+            history[seat][-1][4] = True
+    return history
+
+
+def check_seats(recorded, n):
+    env = UnoEnvironment(PLAYER_COUNT, seed=0)
+    rng = np.random.default_rng(1)
+    seat_transitions = SeatTransitions(PLAYER_COUNT, n, DISCOUNT, env.state_size())
+    for _ in range(GAMES):
+        emitted = []
+        seat_transitions.reset(recorded)
+        history = play_game(env, rng, seat_transitions, collect(emitted))
+
+        expected = []
+        for seat in np.flatnonzero(recorded):
+            expected += n_step_reference(history[seat], n, DISCOUNT)
+
+        # compare the transitions regardless of their order, terminal next states are never bootstrapped
+        key = lambda transition: (transition[0].tobytes(), transition[1], round(transition[2], 4), transition[4],
+                                  None if transition[4] else transition[3].tobytes())
+        assert collections.Counter(map(key, emitted)) == collections.Counter(map(key, expected))
+
+
+def test_seat_transitions():
+    for n in (1, 3):
+        check_seats(np.ones(PLAYER_COUNT, dtype=bool), n)
+
+
+def test_seat_transitions_with_unrecorded_seats():
+    # only the learner's seats are recorded and the episode stops once no recorded seat is left
+    check_seats(np.array([True, False, True, False]), 3)
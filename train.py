@@ -1,70 +1,142 @@
 import sys
 import threading
+import multiprocessing
 import numpy as np
 from agent import UnoAgent
+from actor import run_actor
 from environment import UnoEnvironment
+from collector import run_episodes
+from profiler import profiler
+from checkpoint import is_checkpoint, load_checkpoint_state
 
+# root seed of all random number streams (None for a random seed, whose entropy is printed, logged and checkpointed)
+SEED = None
 PLAYER_COUNT = 4
+# play with a shuffled 108 card deck and optionally observe the remaining draw pile
+FINITE_DECK = False
+DECK_FEATURES = False
 COLLECTOR_THREADS = 2
+# run experience collection in worker processes instead of threads if larger than zero
+COLLECTOR_PROCESSES = 0
+TRANSITION_QUEUE_SIZE = 64
+PROFILE_INTERVAL = 30
+# stored experience (experience/<timestamp>) to pre-train on and warm start the replay memory with
+EXPERIENCE_PATH = None
+PRETRAIN_STEPS = 0
+# league play: seats per game played by frozen checkpoints (the newest matching ones) or the naive heuristic
+LEAGUE_SEATS = 0
+LEAGUE_CHECKPOINTS = 'models/*/model-*.npz'
+LEAGUE_POOL_SIZE = 5
+LEAGUE_NAIVE = True
+LEAGUE_REFRESH_EPISODES = 100
 INITIAL_EPSILON = 1
 EPSILON_DECAY = 0.999999
 MIN_EPSILON = 0.01
 
-def run(agent):
-    # initialize environment
-    epsilon = INITIAL_EPSILON
-    env = UnoEnvironment(PLAYER_COUNT)
+def log_episode(agent, cumulative_reward, mean_reward, game_length, epsilon):
+    # log metrics
+    agent.logger.scalar('cumulative_reward', cumulative_reward)
+    agent.logger.scalar('mean_reward', mean_reward)
+    agent.logger.scalar('game_length', game_length)
+    agent.logger.scalar('epsilon', epsilon)
+    agent.epsilon = epsilon
+
+def run(agent, seed, epsilon, league_settings):
+    # initialize environment and the collector's random streams
+    env_seed, collector_seed = seed.spawn(2)
+    env = UnoEnvironment(PLAYER_COUNT, FINITE_DECK, DECK_FEATURES, seed=env_seed)
+
+    # include the completed transitions in the replay memory and log the metrics of every episode
+    add_transition = lambda *transition: agent.update_replay_memory(transition)
+    episode_done = lambda *metrics: log_episode(agent, *metrics)
+    run_episodes(env, np.random.default_rng(collector_seed), agent.predict, lambda: agent.initialized, add_transition, episode_done,
+                 (epsilon, EPSILON_DECAY, MIN_EPSILON), (agent.N_STEP_RETURNS, agent.DISCOUNT_FACTOR), agent.MASKED_ACTIONS,
+                 league_settings)
 
-    counter = 0
+def receive(agent, transition_queue):
     while True:
-        done = False
-        state = None
-
-        rewards = []
-        # run one episode
-        while not done:
-            if state is None or np.random.sample() < epsilon or not agent.initialized:
-                # choose a random action
-                action = np.random.randint(env.action_count())
-            else:
-                # choose an action from the policy
-                action = agent.predict(state)
-
-            new_state, reward, done, _ = env.step(action)
-            rewards.append(reward)
-
-            if state is not None:
-                # include the current transition in the replay memory
-                agent.update_replay_memory((state, action, reward, new_state, done))
-            state = new_state
-
-            if agent.initialized:
-                # decay epsilon
-                epsilon *= EPSILON_DECAY
-                epsilon = max(epsilon, MIN_EPSILON)
-
-        # log metrics
-        agent.logger.scalar('cumulative_reward', np.sum(rewards))
-        agent.logger.scalar('mean_reward', np.mean(rewards))
-        agent.logger.scalar('game_length', len(rewards))
-        agent.logger.scalar('epsilon', epsilon)
-
-        # reset the environment for the next episode
-        env.reset()
+        # move transition chunks from the worker processes into the replay memory
+        transitions, episodes = transition_queue.get()
+        agent.update_replay_memory_batch(*transitions)
+        profiler.count('transitions_received', len(transitions[0]))
+        profiler.gauge('transition_queue_backlog', transition_queue.qsize())
+
+        # log metrics of the episodes finished by the worker
+        for metrics in episodes:
+            log_episode(agent, *metrics)
+
+def broadcast(weight_queues, weights):
+    # send the updated weights to all worker processes
+    for weight_queue in weight_queues:
+        weight_queue.put(weights)
 
 if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--profile' in args:
+        # enable hot path instrumentation
+        args.remove('--profile')
+        profiler.enabled = True
+
     model_path = None
-    if len(sys.argv) > 1:
-        model_path = sys.argv[1]
+    epsilon = INITIAL_EPSILON
+    if len(args) > 0:
+        # a .h5 model or a checkpoint folder (models/<timestamp> resumes from its latest checkpoint)
+        model_path = args[0]
+        if is_checkpoint(model_path):
+            epsilon = load_checkpoint_state(model_path)['epsilon'] or INITIAL_EPSILON
+
+    # root of all random streams, its entropy replays the run when used as SEED
+    root_seed = np.random.SeedSequence(SEED)
+    print(f'Seed: {root_seed.entropy}')
+    # independent random streams for the agent and every collector
+    agent_seed, *collector_seeds = root_seed.spawn(1 + max(COLLECTOR_PROCESSES, COLLECTOR_THREADS))
+    league_settings = (LEAGUE_SEATS, LEAGUE_CHECKPOINTS, LEAGUE_POOL_SIZE, LEAGUE_NAIVE, LEAGUE_REFRESH_EPISODES)
+
+    if COLLECTOR_PROCESSES > 0:
+        # start worker processes before the agent initializes tensorflow, workers only use NumPy
+        transition_queue = multiprocessing.Queue(TRANSITION_QUEUE_SIZE)
+        weight_queues = [multiprocessing.Queue() for _ in range(COLLECTOR_PROCESSES)]
+        for weight_queue, seed in zip(weight_queues, collector_seeds):
+            epsilon_settings = (epsilon, EPSILON_DECAY, MIN_EPSILON)
+            env_settings = (PLAYER_COUNT, FINITE_DECK, DECK_FEATURES)
+            return_settings = (UnoAgent.N_STEP_RETURNS, UnoAgent.DISCOUNT_FACTOR)
+            multiprocessing.Process(target=run_actor, args=(env_settings, transition_queue, weight_queue, epsilon_settings, return_settings, seed),
+                                    kwargs={'masked_actions': UnoAgent.MASKED_ACTIONS, 'league_settings': league_settings}, daemon=True).start()
 
     # initialize the training agent
-    dummy_env = UnoEnvironment(1)
-    agent = UnoAgent(dummy_env.state_size(), dummy_env.action_count(), model_path)
+    dummy_env = UnoEnvironment(1, FINITE_DECK, DECK_FEATURES)
+    agent = UnoAgent(dummy_env.state_size(), dummy_env.action_count(), model_path, agent_seed)
     del dummy_env
+    # keep the seed with the logs and the checkpoints
+    agent.seed_entropy = root_seed.entropy
+    agent.logger.write_info({'seed': root_seed.entropy})
+
+    if profiler.enabled:
+        # periodically publish the profiling summary
+        profiler.start_reporting(agent.logger, PROFILE_INTERVAL)
+
+    if COLLECTOR_PROCESSES > 0:
+        # receive experience from the workers and broadcast the online model's weights periodically
+        threading.Thread(target=receive, args=(agent, transition_queue), daemon=True).start()
+        agent.model_update_callbacks.append(lambda weights: broadcast(weight_queues, weights))
+        if agent.initialized:
+            # workers act with the resumed model instead of randomly until the first model update
+            broadcast(weight_queues, agent.model.get_weights())
+    else:
+        # start up threads for experience collection
+        for seed in collector_seeds[:COLLECTOR_THREADS]:
+            threading.Thread(target=run, args=(agent, seed, epsilon, league_settings), daemon=True).start()
 
-    # start up threads for experience collection
-    for _ in range(COLLECTOR_THREADS):
-        threading.Thread(target=run, args=(agent,), daemon=True).start()
+    if EXPERIENCE_PATH is not None:
+        # pre-train once the weight broadcast is set up, collectors pause until the trainer catches up
+        agent.load_experience(EXPERIENCE_PATH, PRETRAIN_STEPS)
 
-    # blocking call to agent, invoking an endless training loop
-    agent.train()
+    try:
+        # blocking call to agent, invoking an endless training loop
+        agent.train()
+    finally:
+        if agent.experience_writer is not None:
+            # write the last partial shard of recorded experience
+            agent.experience_writer.flush()
+        # write the metrics logged since the last interval
+        agent.logger.flush()
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class NStepAccumulator:
+
+    def __init__(self, n, discount, state_size):
+        self.n = n
+        self.discount = discount
+
+        # preallocated rolling window of the last n transitions with the running discounted return
+        # of every transition and the discount of the next reward it receives
+        self.states = np.zeros((n, state_size), dtype=np.float32)
+        self.actions = np.zeros(n, dtype=np.int64)
+        self.returns = [0.0] * n
+        self.scales = [1.0] * n
+        self.start = 0
+        self.count = 0
+
+    def add(self, state, action, reward, next_state, done, next_mask, emit):
+        # store the transition at the end of the window
+        index = (self.start + self.count) % self.n
+        self.states[index], self.actions[index] = state, action
+        self.returns[index] = 0.0
+        self.scales[index] = 1.0
+        self.count += 1
+
+        # add the discounted reward to the returns of all transitions in the window
+        for i in range(self.count):
+            slot = (self.start + i) % self.n
+            self.returns[slot] += self.scales[slot] * reward
+            self.scales[slot] *= self.discount
+
+        # emit n-step transitions (the emitted states are only valid during the call):
+        # the oldest one once the window is full or all of them at the end of the episode
+        while self.count == self.n or (done and self.count > 0):
+            emit(self.states[self.start], self.actions[self.start], self.returns[self.start], next_state, done, next_mask)
+            self.start = (self.start + 1) % self.n
+            self.count -= 1
+
+    def reset(self):
+        self.start = 0
+        self.count = 0
+
+
+class SeatTransitions:
+
+    def __init__(self, player_count, n, discount, state_size):
+        self.player_count = player_count
+        # every seat collects its own n-step transitions from its own observations
+        self.accumulators = [NStepAccumulator(n, discount, state_size) for _ in range(player_count)]
+
+        # preallocated transition of every seat which waits for the seat's next observation
+        self.states = np.zeros((player_count, state_size), dtype=np.float32)
+        self.actions = np.zeros(player_count, dtype=np.int64)
+        self.rewards = np.zeros(player_count, dtype=np.float32)
+        self.pending = np.zeros(player_count, dtype=bool)
+        self.recorded = np.ones(player_count, dtype=bool)
+        self.reset()
+
+    def reset(self, recorded=None):
+        # seat of every player in the environment's player list (players are removed from it during the game)
+        self.seats = list(range(self.player_count))
+        self.pending[:] = False
+        # only the transitions of recorded seats are emitted (e.g. not those of frozen opponents)
+        self.recorded[:] = True if recorded is None else recorded
+        # number of recorded seats which are still in the game
+        self.recorded_left = np.count_nonzero(self.recorded)
+        for accumulator in self.accumulators:
+            accumulator.reset()
+
+    def step(self, state, action, reward, next_state, done, next_mask, step_info, next_turn, emit):
+        # next_mask is the legal action mask of next_state (None without action masking)
+        seat = self.seats[step_info['turn']]
+
+        if step_info['player'] in (-1, 2):
+            # the player was eliminated or finished, its last transition ends the seat's episode
+            if self.recorded[seat]:
+                self.accumulators[seat].add(state, action, reward, next_state, True, next_mask, emit)
+                self.recorded_left -= 1
+            del self.seats[step_info['turn']]
+        elif self.recorded[seat]:
+            # wait until the same seat observes the game again
+            self.states[seat], self.actions[seat], self.rewards[seat] = state, action, reward
+            self.pending[seat] = True
+
+        if done:
+            # the episode ended for all remaining seats
+            for seat in self.seats:
+                self._complete(seat, next_state, True, next_mask, emit)
+        else:
+            # the next observation belongs to the seat which has the turn now
+            self._complete(self.seats[next_turn], next_state, False, next_mask, emit)
+
+    def recording(self):
+        # whether any recorded seat is still in the game
+        return self.recorded_left > 0
+
+    def _complete(self, seat, next_state, done, next_mask, emit):
+        if self.pending[seat]:
+            self.accumulators[seat].add(self.states[seat], self.actions[seat], self.rewards[seat], next_state, done, next_mask, emit)
+            self.pending[seat] = False